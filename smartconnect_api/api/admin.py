@@ -1,5 +1,7 @@
 from django.contrib import admin
 from .models import Departamento, Sensor, Evento, Barrera
+from .eventos import actualizar_resumenes, descontar_resumenes
+from .routers import leer_de_replica
 
 @admin.register(Departamento)
 class DepartamentoAdmin(admin.ModelAdmin):
@@ -29,3 +31,27 @@ class EventoAdmin(admin.ModelAdmin):
     search_fields = ('tipo', 'sensor__nombre')
     list_filter = ('tipo', 'resultado', 'creado_en', 'departamento')
     readonly_fields = ('creado_en',)
+
+    # El admin guarda y borra dentro de una transacción: los conteos por hora
+    # (EventoResumenHora) se corrigen en la misma
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            descontar_resumenes(Evento.objects.filter(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        actualizar_resumenes([obj])
+
+    def delete_model(self, request, obj):
+        descontar_resumenes(Evento.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        descontar_resumenes(queryset)
+        super().delete_queryset(request, queryset)
+
+    def changelist_view(self, request, extra_context=None):
+        # Las acciones masivas (POST) se atienden con la primaria
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with leer_de_replica():
+            return super().changelist_view(request, extra_context)
@@ -0,0 +1,319 @@
+"""
+Retención y archivo de eventos antiguos.
+
+Los eventos anteriores al corte se mueven a archivos NDJSON comprimidos, uno
+por mes (``eventos-AAAA-MM.ndjson.gz``, mes en la zona horaria local), con
+los mismos campos que devuelve ``EventoSerializer``. Las filas se borran en
+lotes pequeños, cada uno en su propia transacción, para no retener el
+bloqueo de escritura de SQLite. Los conteos de ``EventoResumenHora`` se
+conservan.
+"""
+import gzip
+import heapq
+import itertools
+import json
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import LRUCache
+from .eventos import hora_resumen
+from .exportacion import CAMPOS, INDICE_FECHA, NOMBRES
+from .models import Evento
+
+PATRON_ARCHIVO = re.compile(r'^eventos-(\d{4})-(\d{2})\.ndjson\.gz$')
+TAMANO_LECTURA = 64 * 1024
+
+
+def directorio_archivo() -> Path:
+    return Path(settings.EVENTOS_ARCHIVO_DIR)
+
+
+def ruta_mes(anio: int, mes: int) -> Path:
+    return directorio_archivo() / f'eventos-{anio:04d}-{mes:02d}.ndjson.gz'
+
+
+def corte_retencion(dias: Optional[int] = None) -> datetime:
+    """Fecha de corte alineada a la hora, para no partir un resumen horario"""
+    dias = settings.EVENTOS_RETENCION_DIAS if dias is None else dias
+    return hora_resumen(timezone.now() - timedelta(days=dias))
+
+
+# ============ ARCHIVADO ============
+
+def _escribir_mes(ruta: Path, filas: List[dict]) -> None:
+    """Agrega un miembro gzip al archivo del mes y lo sincroniza a disco"""
+    contenido = ''.join(
+        json.dumps(fila, ensure_ascii=False, separators=(',', ':')) + '\n'
+        for fila in filas
+    ).encode('utf-8')
+    with open(ruta, 'ab') as archivo:
+        with gzip.GzipFile(fileobj=archivo, mode='ab') as comprimido:
+            comprimido.write(contenido)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+
+
+def archivar_eventos(antes_de: Optional[datetime] = None, lote: Optional[int] = None,
+                     pausa: float = 0.05) -> int:
+    """
+    Archiva y borra los eventos anteriores a ``antes_de``.
+
+    Cada lote se escribe primero en disco y luego se borra en una transacción
+    corta; si el proceso se interrumpe entre ambos pasos, el lote se vuelve a
+    escribir en la siguiente ejecución y la lectura descarta los duplicados.
+    Devuelve la cantidad de eventos archivados. Pensada para ejecutarse
+    periódicamente desde cron con ``manage.py archivar_eventos``.
+    """
+    antes_de = antes_de or corte_retencion()
+    lote = lote or settings.EVENTOS_ARCHIVO_LOTE
+    directorio_archivo().mkdir(parents=True, exist_ok=True)
+
+    pendientes = Evento.objects.filter(creado_en__lt=antes_de).order_by('creado_en', 'id')
+    total = 0
+    while True:
+        filas = list(pendientes.values_list(*CAMPOS)[:lote])
+        if not filas:
+            break
+
+        por_mes: Dict[Tuple[int, int], List[dict]] = {}
+        for fila in filas:
+            fecha = timezone.localtime(fila[INDICE_FECHA])
+            fila = list(fila)
+            fila[INDICE_FECHA] = fecha.isoformat()
+            datos = dict(zip(NOMBRES, fila))
+            if datos['usuario'] is None:
+                # EventoSerializer omite usuario_username cuando no hay usuario
+                del datos['usuario_username']
+            por_mes.setdefault((fecha.year, fecha.month), []).append(datos)
+        for (anio, mes), filas_mes in por_mes.items():
+            _escribir_mes(ruta_mes(anio, mes), filas_mes)
+
+        with transaction.atomic():
+            Evento.objects.filter(id__in=[fila[0] for fila in filas]).delete()
+        total += len(filas)
+
+        if pausa:
+            # Deja pasar a las escrituras de registrar_acceso entre lotes
+            time.sleep(pausa)
+    return total
+
+
+# ============ LECTURA ============
+
+def meses_archivados() -> List[Tuple[int, int]]:
+    try:
+        nombres = os.listdir(directorio_archivo())
+    except OSError:
+        return []
+    meses = []
+    for nombre in nombres:
+        coincidencia = PATRON_ARCHIVO.match(nombre)
+        if coincidencia:
+            meses.append((int(coincidencia.group(1)), int(coincidencia.group(2))))
+    return sorted(meses)
+
+
+def _limites_mes(anio: int, mes: int) -> Tuple[datetime, datetime]:
+    inicio = timezone.make_aware(datetime(anio, mes, 1))
+    siguiente = datetime(anio + 1, 1, 1) if mes == 12 else datetime(anio, mes + 1, 1)
+    return inicio, timezone.make_aware(siguiente)
+
+
+class Miembro(NamedTuple):
+    """Un miembro gzip del archivo del mes (un lote de ``archivar_eventos``)"""
+    offset: int
+    longitud: int
+    minimo: Tuple[int, int]
+    maximo: Tuple[int, int]
+
+
+# Índice de miembros por archivo: ruta -> (bytes indexados, miembros)
+_indices = LRUCache(max_size=64)
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+def _clave(fecha: datetime, pk: int) -> Tuple[int, int]:
+    """Posición como enteros (microsegundos, id), comparable sin zonas horarias"""
+    return (fecha - _EPOCA) // _MICROSEGUNDO, pk
+
+
+def _filas_texto(texto: bytes) -> Iterator[dict]:
+    for linea in texto.decode('utf-8').splitlines():
+        if linea.strip():
+            fila = json.loads(linea)
+            fila.setdefault('repeticiones', 0)  # Archivado antes de existir el campo
+            yield fila
+
+
+def _indexar(ruta: Path, desde: int, miembros: List[Miembro]) -> int:
+    """
+    Recorre los miembros gzip a partir del byte ``desde`` y agrega a
+    ``miembros`` su offset y sus posiciones mínima y máxima. Devuelve hasta
+    qué byte quedó indexado (un miembro a medio escribir no se cuenta).
+    """
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(desde)
+        inicio = leido = desde
+        descompresor = zlib.decompressobj(31)
+        texto = []
+        sobrante = b''
+        while True:
+            if sobrante:
+                # Comienzo del miembro siguiente, ya leído del archivo
+                bloque, sobrante = sobrante, b''
+            else:
+                bloque = archivo.read(TAMANO_LECTURA)
+                if not bloque:
+                    return inicio
+                leido += len(bloque)
+            texto.append(descompresor.decompress(bloque))
+            if not descompresor.eof:
+                continue
+            sobrante = descompresor.unused_data
+            fin = leido - len(sobrante)
+            claves = [_clave(*posicion(fila)) for fila in _filas_texto(b''.join(texto))]
+            if claves:
+                miembros.append(Miembro(inicio, fin - inicio, min(claves), max(claves)))
+            inicio = fin
+            texto = []
+            descompresor = zlib.decompressobj(31)
+
+
+def indice_mes(anio: int, mes: int) -> List[Miembro]:
+    """
+    Miembros del archivo del mes. El índice se guarda en memoria y, como el
+    archivo solo crece, al agregarse lotes se indexan solo los bytes nuevos.
+    """
+    ruta = ruta_mes(anio, mes)
+    try:
+        tamano = os.stat(ruta).st_size
+    except OSError:
+        return []
+    indexado, miembros = _indices.get(str(ruta), (0, []))
+    if tamano < indexado:
+        indexado, miembros = 0, []  # El archivo fue reemplazado
+    if tamano > indexado:
+        miembros = list(miembros)
+        indexado = _indexar(ruta, indexado, miembros)
+        _indices.set(str(ruta), (indexado, miembros))
+    return miembros
+
+
+def _leer_miembro(ruta: Path, miembro: Miembro) -> Iterator[dict]:
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(miembro.offset)
+        comprimido = archivo.read(miembro.longitud)
+    return _filas_texto(zlib.decompress(comprimido, 31))
+
+
+def posicion(fila: dict) -> Tuple[datetime, int]:
+    return datetime.fromisoformat(fila['creado_en']), fila['id']
+
+
+def _filas_mes(anio: int, mes: int, aceptar: Callable[[dict], bool],
+               despues_de: Optional[Tuple[int, int]], descendente: bool) -> Iterator[dict]:
+    """
+    Filas del mes en orden de (creado_en, id) a partir de ``despues_de``.
+
+    Solo descomprime los miembros que pueden tener filas tras el cursor, de
+    a uno: una fila se entrega cuando ningún miembro sin leer puede tener una
+    anterior en el recorrido. Los lotes de un mes casi no se solapan, así que
+    una página lee uno o dos miembros.
+    """
+    ruta = ruta_mes(anio, mes)
+    signo = -1 if descendente else 1
+
+    def orden(clave):
+        # Clave del heap: en orden descendente se invierten ambos enteros
+        return clave[0] * signo, clave[1] * signo
+
+    miembros = [
+        miembro for miembro in indice_mes(anio, mes)
+        if not despues_de or (miembro.minimo < despues_de if descendente else miembro.maximo > despues_de)
+    ]
+    # La fila más cercana al comienzo del recorrido de cada miembro
+    primeras = sorted(orden(miembro.maximo if descendente else miembro.minimo) + (indice,)
+                      for indice, miembro in enumerate(miembros))
+
+    pendientes: List[tuple] = []
+    cargadas = itertools.count()  # Desempate: nunca se comparan los dict
+    siguiente = 0
+    while True:
+        while siguiente < len(primeras) and (not pendientes or primeras[siguiente][:2] <= pendientes[0][:2]):
+            for fila in _leer_miembro(ruta, miembros[primeras[siguiente][2]]):
+                clave = _clave(*posicion(fila))
+                if despues_de and ((clave >= despues_de) if descendente else (clave <= despues_de)):
+                    continue
+                if aceptar(fila):
+                    heapq.heappush(pendientes, orden(clave) + (next(cargadas), fila))
+            siguiente += 1
+        if not pendientes:
+            return
+        yield heapq.heappop(pendientes)[3]
+
+
+def leer_archivo(filtros: Dict[str, str], desde: Optional[datetime], hasta: Optional[datetime],
+                 despues_de: Optional[Tuple[datetime, int]], limite: int,
+                 descendente: bool = True) -> List[dict]:
+    """
+    Devuelve hasta ``limite`` eventos archivados, ordenados por (creado_en, id).
+
+    ``filtros`` compara por igualdad contra los campos serializados (por
+    ejemplo ``{'sensor': '3'}``) y ``despues_de`` es la posición del último
+    registro ya entregado en el sentido de recorrido. Solo se leen los meses
+    que se cruzan con el rango pedido y, dentro de cada mes, los lotes
+    necesarios para completar la página.
+
+    Se descartan los eventos escritos dos veces y los que siguen en la base
+    de datos (un ``archivar_eventos`` interrumpido entre la escritura y el
+    borrado): el listado ya los entrega desde la base.
+    """
+    resultado: List[dict] = []
+    meses = meses_archivados()
+    if descendente:
+        meses.reverse()
+    cursor = _clave(*despues_de) if despues_de else None
+
+    def aceptar(fila):
+        if any(str(fila.get(campo)) != valor for campo, valor in filtros.items()):
+            return False
+        fecha = datetime.fromisoformat(fila['creado_en'])
+        return not ((desde and fecha < desde) or (hasta and fecha >= hasta))
+
+    vistos = set()
+    for anio, mes in meses:
+        inicio, fin = _limites_mes(anio, mes)
+        if (desde and fin <= desde) or (hasta and inicio >= hasta):
+            continue
+        if despues_de and (inicio > despues_de[0] if descendente else fin <= despues_de[0]):
+            continue
+
+        filas = _filas_mes(anio, mes, aceptar, cursor, descendente)
+        while len(resultado) < limite:
+            candidatas = []
+            for fila in filas:
+                if fila['id'] not in vistos:
+                    vistos.add(fila['id'])
+                    candidatas.append(fila)
+                    if len(candidatas) >= limite - len(resultado):
+                        break
+            if not candidatas:
+                break
+            en_base = set(
+                Evento.objects.filter(id__in=[fila['id'] for fila in candidatas]).values_list('id', flat=True)
+            )
+            resultado.extend(fila for fila in candidatas if fila['id'] not in en_base)
+        if len(resultado) >= limite:
+            break
+    return resultado
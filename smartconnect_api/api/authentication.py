@@ -0,0 +1,89 @@
+"""
+Autenticación JWT con caché del usuario resuelto
+"""
+import copy
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import LRUCache, generacion
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` que no consulta la tabla de usuarios en cada petición.
+
+    El usuario se guarda en una caché LRU del proceso con la clave
+    (id de usuario, ``jti`` del token), solo después de pasar las mismas
+    validaciones que simplejwt (usuario existente y activo). Al guardar o
+    borrar un usuario, las señales de ``api/signals.py`` vacían la caché de
+    este proceso e incrementan la marca de ``generacion``, con lo que los
+    demás procesos vacían la suya. Así una desactivación o un cambio de
+    ``is_staff`` se aplica en la siguiente petición. Los cambios hechos con ``QuerySet.update()`` no
+    emiten señales: esos quedan acotados por ``JWT_USUARIO_CACHE_TTL``.
+
+    Cada petición recibe una copia del usuario, de modo que lo que la vista
+    modifique no queda en la caché.
+    """
+    usuarios = LRUCache(
+        max_size=getattr(settings, 'JWT_USUARIO_CACHE_SIZE', 10000),
+        ttl=getattr(settings, 'JWT_USUARIO_CACHE_TTL', 300),
+    )
+    _generacion_vista = generacion.actual()
+    _version = 0
+
+    @classmethod
+    def _sincronizar(cls) -> None:
+        actual = generacion.actual()
+        if actual != cls._generacion_vista:
+            cls._generacion_vista = actual
+            cls._version += 1
+            cls.usuarios.clear()
+
+    @classmethod
+    def invalidar(cls) -> None:
+        """Vacía la caché de este proceso (los demás la vacían al ver la nueva ``generacion``)"""
+        cls._version += 1
+        cls.usuarios.clear()
+
+    def get_user(self, validated_token):
+        self._sincronizar()
+        clave = (
+            validated_token.get(api_settings.USER_ID_CLAIM),
+            validated_token.get(api_settings.JTI_CLAIM),
+        )
+        if clave[0] is None or clave[1] is None:
+            return super().get_user(validated_token)
+
+        user = self.usuarios.get(clave)
+        if user is None:
+            version = CachedJWTAuthentication._version
+            user = super().get_user(validated_token)
+            if version == CachedJWTAuthentication._version:
+                self.usuarios.set(clave, user)
+        return copy.copy(user)
+
+
+class MetricasTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <METRICAS_TOKEN>`` para que Prometheus lea las
+    métricas sin un usuario. Cualquier otro valor queda para el siguiente
+    autenticador (JWT); ver ``IsAdminOrMetricasToken``.
+    """
+
+    def authenticate(self, request):
+        token = getattr(settings, 'METRICAS_TOKEN', '')
+        partes = get_authorization_header(request).split()
+        if not token or len(partes) != 2 or partes[0].lower() != b'bearer':
+            return None
+        if not hmac.compare_digest(partes[1], token.encode()):
+            return None
+        return AnonymousUser(), None
+
+    def authenticate_header(self, request):
+        # Primero en la lista: define el 401 (sin esto DRF responde 403)
+        return 'Bearer realm="api"'
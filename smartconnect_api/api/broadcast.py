@@ -0,0 +1,205 @@
+"""
+Difusión en tiempo real de los cambios de estado de las barreras.
+
+Un único ``BarreraBroadcaster`` por proceso consulta la tabla de barreras
+cada ``BARRERAS_POLL_MS`` (una consulta por proceso, sin importar cuántos
+clientes estén conectados) y reparte los cambios a los suscriptores que
+esperan en una ``threading.Condition``. Así se detectan también los cambios
+hechos por otros workers. Los cambios del propio proceso despiertan la
+consulta de inmediato.
+
+Cada cambio se identifica por ``<actualizado_en en µs>-<id de barrera>``,
+un valor común a todos los procesos: un cliente que se reconecta con ese id
+(``Last-Event-ID``) recibe lo que cambió desde entonces. Como un cambio puede
+confirmarse después de otro con un ``actualizado_en`` posterior, se entregan
+también los de ``MARGEN_POLL`` antes del id; cada conexión recuerda qué
+estado envió de cada barrera para no repetirlos, y al reconectar alguno
+puede llegar dos veces (es el estado completo de la barrera, no un delta).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Barrera
+
+logger = logging.getLogger(__name__)
+
+Clave = Tuple[int, int]
+
+CAMPOS_BARRERA = ('id', 'departamento_id', 'nombre', 'estado', 'modo_manual', 'actualizado_en')
+
+# Margen para cambios confirmados con un actualizado_en anterior al último visto
+MARGEN_POLL = timedelta(seconds=2)
+_MARGEN_US = MARGEN_POLL // timedelta(microseconds=1)
+
+
+def clave_cambio(fila: dict) -> Clave:
+    micros = int(fila['actualizado_en'].timestamp() * 1_000_000)
+    return micros, fila['id']
+
+
+def id_evento(clave: Clave) -> str:
+    return f'{clave[0]}-{clave[1]}'
+
+
+def parse_id_evento(valor: Optional[str]) -> Optional[Clave]:
+    try:
+        micros, barrera_id = str(valor).split('-', 1)
+        return int(micros), int(barrera_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def pendiente(clave: Clave, barrera_id: int, despues_de: Optional[Clave],
+              enviados: Optional[Dict[int, Clave]] = None) -> bool:
+    """Si el cambio falta enviarlo a un cliente que ya recibió hasta ``despues_de``"""
+    if enviados and clave <= enviados.get(barrera_id, (0, 0)):
+        return False
+    if despues_de is None:
+        return True
+    return clave != despues_de and clave[0] > despues_de[0] - _MARGEN_US
+
+
+def _payload(fila: dict) -> dict:
+    return {
+        'id': fila['id'],
+        'departamento': fila['departamento_id'],
+        'nombre': fila['nombre'],
+        'estado': fila['estado'],
+        'modo_manual': fila['modo_manual'],
+        'actualizado_en': timezone.localtime(fila['actualizado_en']).isoformat(),
+    }
+
+
+def cambios_desde(despues_de: Optional[Clave], departamento_id=None,
+                  enviados: Optional[Dict[int, Clave]] = None) -> List[Tuple[Clave, dict]]:
+    """Estado de las barreras modificadas después de ``despues_de`` (todas si es None)"""
+    barreras = Barrera.objects.order_by('actualizado_en', 'id')
+    if departamento_id:
+        barreras = barreras.filter(departamento_id=departamento_id)
+    if despues_de:
+        desde = datetime.fromtimestamp(despues_de[0] / 1_000_000, tz=dt_timezone.utc)
+        barreras = barreras.filter(actualizado_en__gte=desde - MARGEN_POLL)
+    cambios = []
+    for fila in barreras.values(*CAMPOS_BARRERA):
+        clave = clave_cambio(fila)
+        if pendiente(clave, fila['id'], despues_de, enviados):
+            cambios.append((clave, _payload(fila)))
+    return cambios
+
+
+class BarreraBroadcaster:
+    """Reparte los cambios de estado de barreras a los suscriptores del proceso"""
+
+    def __init__(self, intervalo_ms: int = 500, historial: int = 1000):
+        self.intervalo = intervalo_ms / 1000
+        self._condicion = threading.Condition()
+        self._historial: deque = deque(maxlen=historial)
+        self._conocidos: Dict[int, Clave] = {}
+        self._ultimo: Optional[datetime] = None
+        self._suscriptores = 0
+        self._despertar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ============ PUBLICACIÓN ============
+
+    def notificar(self) -> None:
+        """Pide una consulta inmediata (llamado al modificar una barrera en este proceso)"""
+        self._despertar.set()
+
+    def _publicar(self, cambios: List[Tuple[Clave, dict]]) -> None:
+        nuevos = []
+        for clave, payload in cambios:
+            if clave > self._conocidos.get(payload['id'], (0, 0)):
+                self._conocidos[payload['id']] = clave
+                nuevos.append((clave, payload))
+        if nuevos:
+            with self._condicion:
+                self._historial.extend(sorted(nuevos, key=lambda cambio: cambio[0]))
+                self._condicion.notify_all()
+
+    def _consultar(self) -> None:
+        barreras = Barrera.objects.order_by('actualizado_en')
+        if self._ultimo is not None:
+            barreras = barreras.filter(actualizado_en__gt=self._ultimo - MARGEN_POLL)
+        filas = list(barreras.values(*CAMPOS_BARRERA))
+        if not filas:
+            return
+        self._ultimo = max(self._ultimo or filas[-1]['actualizado_en'], filas[-1]['actualizado_en'])
+        self._publicar([(clave_cambio(fila), _payload(fila)) for fila in filas])
+
+    def _bucle(self) -> None:
+        while True:
+            self._despertar.wait(self.intervalo if self._suscriptores else 5)
+            self._despertar.clear()
+            if not self._suscriptores:
+                continue
+            try:
+                self._consultar()
+            except Exception:
+                logger.exception('Error al consultar cambios de barreras')
+                connection.close()
+
+    def _iniciar(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            # Estado inicial: lo ya existente no se difunde como cambio
+            for fila in Barrera.objects.values(*CAMPOS_BARRERA):
+                self._conocidos[fila['id']] = clave_cambio(fila)
+                if self._ultimo is None or fila['actualizado_en'] > self._ultimo:
+                    self._ultimo = fila['actualizado_en']
+            self._hilo = threading.Thread(target=self._bucle, name='barrera-broadcaster', daemon=True)
+            self._hilo.start()
+
+    # ============ SUSCRIPCIÓN ============
+
+    def suscribir(self) -> None:
+        self._iniciar()
+        with self._condicion:
+            self._suscriptores += 1
+
+    def desuscribir(self) -> None:
+        with self._condicion:
+            self._suscriptores -= 1
+
+    def esperar(self, despues_de: Optional[Clave], departamento_id=None,
+                timeout: float = 15, enviados: Optional[Dict[int, Clave]] = None) -> List[Tuple[Clave, dict]]:
+        """
+        Bloquea hasta que haya cambios pendientes para el cliente (ver
+        ``pendiente``) o venza ``timeout``. Si el historial en memoria ya no
+        alcanza, se recupera desde la base de datos.
+        """
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            while True:
+                if (despues_de and len(self._historial) == self._historial.maxlen
+                        and self._historial[0][0][0] > despues_de[0] - _MARGEN_US):
+                    break  # Se perdieron cambios: recuperar desde la base de datos
+                cambios = [
+                    (clave, payload) for clave, payload in self._historial
+                    if pendiente(clave, payload['id'], despues_de, enviados)
+                    and (not departamento_id or str(payload['departamento']) == str(departamento_id))
+                ]
+                if cambios:
+                    return cambios
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return []
+                self._condicion.wait(restante)
+        return cambios_desde(despues_de, departamento_id, enviados)
+
+
+broadcaster = BarreraBroadcaster(
+    intervalo_ms=getattr(settings, 'BARRERAS_POLL_MS', 500),
+)
@@ -0,0 +1,312 @@
+"""
+Cachés en memoria del proceso para las rutas de alto tráfico
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from django.conf import settings
+
+
+_SIN_VALOR = object()
+
+
+class LRUCache:
+    """
+    Caché LRU acotada con expiración opcional por entrada.
+
+    Es segura entre hilos y no hace ninguna lectura a la base de datos:
+    quien la usa decide qué guardar y cuándo invalidar.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is _SIN_VALOR:
+                return default
+            valor, expira = entrada
+            if expira is not None and expira <= time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_size:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+class GeneracionCompartida:
+    """
+    Marca de invalidación compartida entre procesos.
+
+    Cada worker de gunicorn tiene sus propias cachés; cuando un proceso
+    invalida, actualiza el mtime de un archivo y el resto de procesos lo
+    detecta con un ``stat`` (sin consultas a la base de datos).
+    """
+
+    def __init__(self, ruta: Optional[str]):
+        self.ruta = ruta
+        self._vista = self.actual()
+
+    def actual(self) -> int:
+        if not self.ruta:
+            return 0
+        try:
+            return os.stat(self.ruta).st_mtime_ns
+        except OSError:
+            return 0
+
+    def incrementar(self) -> None:
+        if not self.ruta:
+            return
+        try:
+            with open(self.ruta, 'a'):
+                pass
+            os.utime(self.ruta, ns=(time.time_ns(), time.time_ns()))
+        except OSError:
+            pass
+        self._vista = self.actual()
+
+    def cambio(self) -> bool:
+        """Indica si otro proceso invalidó desde la última comprobación"""
+        actual = self.actual()
+        if actual != self._vista:
+            self._vista = actual
+            return True
+        return False
+
+
+generacion = GeneracionCompartida(getattr(settings, 'CACHE_GENERACION_ARCHIVO', None))
+
+
+class AccesoCache:
+    """
+    Caché de lectura para las decisiones de ``registrar_acceso``.
+
+    - Sensores por ``uid``: estado, departamento, usuario asignado y la
+      representación serializada que se devuelve al permitir el acceso.
+    - Departamentos por ``id``: ``activo`` y el id de su barrera.
+    - Lecturas recientes por (``uid``, departamento), durante la ventana de
+      ``ACCESO_DEBOUNCE_MS``: la decisión ya tomada para esa tarjeta.
+
+    Se invalida con las señales de guardado/borrado de los modelos (ver
+    ``api/signals.py``), de modo que ``bloquear``, ``marcar_perdido`` y los
+    cambios hechos desde el admin se aplican de inmediato.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None, debounce: float = 0):
+        self.sensores = LRUCache(max_size=max_size, ttl=ttl)
+        self.departamentos = LRUCache(max_size=max_size, ttl=ttl)
+        self.debounce = debounce
+        self.lecturas = LRUCache(max_size=max_size, ttl=debounce)
+        # Evita guardar lecturas que empezaron antes de una invalidación
+        self._version = 0
+
+    def _sincronizar(self) -> None:
+        if generacion.cambio():
+            self._version += 1
+            self.sensores.clear()
+            self.departamentos.clear()
+            self.lecturas.clear()
+
+    def get_sensor(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la información del sensor o None si no existe"""
+        from .models import Sensor
+
+        self._sincronizar()
+        info = self.sensores.get(uid)
+        if info is not None:
+            return info
+
+        version = self._version
+        sensor = (
+            Sensor.objects
+            .select_related('departamento', 'usuario_asignado')
+            .filter(uid=uid)
+            .first()
+        )
+        if sensor is None:
+            return None
+
+        info = self._info_sensor(sensor)
+        if version == self._version:
+            self.sensores.set(uid, info)
+        return info
+
+    def get_departamento(self, departamento_id) -> Optional[Dict[str, Any]]:
+        """Devuelve la información del departamento o None si no existe"""
+        from .models import Departamento
+
+        self._sincronizar()
+        try:
+            clave = int(departamento_id)
+        except (TypeError, ValueError):
+            return None
+        info = self.departamentos.get(clave)
+        if info is not None:
+            return info
+
+        version = self._version
+        fila = (
+            Departamento.objects
+            .filter(id=clave)
+            .values('id', 'activo', 'barrera__id')
+            .first()
+        )
+        if fila is None:
+            return None
+
+        info = self._info_departamento(fila)
+        if version == self._version:
+            self.departamentos.set(clave, info)
+        return info
+
+    def get_sensores(self, uids) -> Dict[str, Dict[str, Any]]:
+        """
+        Resuelve varios sensores a la vez.
+
+        Los que no están en caché se leen con una sola consulta ``IN``.
+        Los uid inexistentes no aparecen en el resultado.
+        """
+        from .models import Sensor
+
+        self._sincronizar()
+        encontrados = {}
+        faltantes = set()
+        for uid in uids:
+            info = self.sensores.get(uid)
+            if info is None:
+                faltantes.add(uid)
+            else:
+                encontrados[uid] = info
+
+        if faltantes:
+            version = self._version
+            sensores = (
+                Sensor.objects
+                .select_related('departamento', 'usuario_asignado')
+                .filter(uid__in=faltantes)
+            )
+            for sensor in sensores:
+                info = self._info_sensor(sensor)
+                encontrados[sensor.uid] = info
+                if version == self._version:
+                    self.sensores.set(sensor.uid, info)
+        return encontrados
+
+    def get_departamentos(self, departamento_ids) -> Dict[int, Dict[str, Any]]:
+        """
+        Resuelve varios departamentos a la vez con una sola consulta ``IN``
+        para los que no están en caché. Las claves del resultado son enteros.
+        """
+        from .models import Departamento
+
+        self._sincronizar()
+        encontrados = {}
+        faltantes = set()
+        for departamento_id in departamento_ids:
+            try:
+                clave = int(departamento_id)
+            except (TypeError, ValueError):
+                continue
+            info = self.departamentos.get(clave)
+            if info is None:
+                faltantes.add(clave)
+            else:
+                encontrados[clave] = info
+
+        if faltantes:
+            version = self._version
+            filas = (
+                Departamento.objects
+                .filter(id__in=faltantes)
+                .values('id', 'activo', 'barrera__id')
+            )
+            for fila in filas:
+                info = self._info_departamento(fila)
+                encontrados[fila['id']] = info
+                if version == self._version:
+                    self.departamentos.set(fila['id'], info)
+        return encontrados
+
+    @staticmethod
+    def _info_sensor(sensor) -> Dict[str, Any]:
+        from .serializers import SensorSerializer
+
+        return {
+            'id': sensor.id,
+            'estado': sensor.estado,
+            'departamento_id': sensor.departamento_id,
+            'usuario_asignado_id': sensor.usuario_asignado_id,
+            'data': SensorSerializer(sensor).data,
+        }
+
+    @staticmethod
+    def _info_departamento(fila) -> Dict[str, Any]:
+        return {
+            'id': fila['id'],
+            'activo': fila['activo'],
+            'barrera_id': fila['barrera__id'],
+        }
+
+    def invalidar(self) -> None:
+        """
+        Vacía las cachés (sensores, departamentos y lecturas) en este y en los demás procesos.
+
+        Los cambios de sensores, departamentos, barreras o usuarios son poco
+        frecuentes y pueden alterar varias entradas a la vez (un cambio de
+        ``uid``, el nombre de un departamento serializado en sus sensores),
+        así que se invalida todo en lugar de entrada por entrada.
+        """
+        self._version += 1
+        self.sensores.clear()
+        self.departamentos.clear()
+        self.lecturas.clear()
+        generacion.incrementar()
+
+    # ============ LECTURAS REPETIDAS ============
+
+    def get_lectura(self, uid: str, departamento_id) -> Optional[Dict[str, Any]]:
+        """Decisión tomada para la misma tarjeta y departamento dentro de la ventana"""
+        if not self.debounce:
+            return None
+        # Un sensor bloqueado desde otro worker no debe seguir respondiendo
+        # con la decisión anterior
+        self._sincronizar()
+        return self.lecturas.get((uid, str(departamento_id)))
+
+    def set_lectura(self, uid: str, departamento_id, lectura: Dict[str, Any]) -> None:
+        if self.debounce:
+            self.lecturas.set((uid, str(departamento_id)), lectura)
+
+
+acceso_cache = AccesoCache(
+    max_size=getattr(settings, 'ACCESO_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'ACCESO_CACHE_TTL', None),
+    debounce=getattr(settings, 'ACCESO_DEBOUNCE_MS', 0) / 1000,
+)
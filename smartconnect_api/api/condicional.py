@@ -0,0 +1,79 @@
+"""
+GET condicional (ETag) para los listados que cambian poco
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+from .cache import LRUCache, generacion
+
+
+class ListaCondicionalMixin:
+    """
+    ``list`` con ETag y caché del cuerpo ya renderizado.
+
+    El validador sale de una sola consulta agregada sobre el queryset filtrado
+    (``MAX(actualizado_en)`` y ``COUNT``), más la marca de ``generacion``,
+    que cambia con cualquier guardado o borrado de sensores, departamentos,
+    barreras o usuarios (cubre los campos de modelos relacionados, como
+    ``departamento_nombre``), más la URL completa y el formato de respuesta.
+
+    Si coincide con ``If-None-Match`` se responde 304 sin serializar nada. Si
+    no, el cuerpo JSON se busca en una caché LRU del proceso con ese mismo
+    validador como clave. ``Last-Modified`` es solo informativo: un borrado
+    no lo cambia, por eso no se atiende ``If-Modified-Since``.
+    """
+    listas_cache = LRUCache(max_size=getattr(settings, 'LISTAS_CACHE_SIZE', 256))
+
+    def queryset_validador(self, queryset):
+        """Queryset sobre el que se calcula el validador (sin anotaciones costosas)"""
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            # La API navegable incluye datos del usuario: sin caché
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        agregado = self.queryset_validador(queryset).order_by().aggregate(
+            ultimo=Max('actualizado_en'), total=Count('pk')
+        )
+        validador = '|'.join(str(parte) for parte in (
+            queryset.model._meta.label,
+            agregado['ultimo'] and agregado['ultimo'].isoformat(),
+            agregado['total'],
+            generacion.actual(),
+            request.get_full_path(),
+            request.accepted_media_type,
+        ))
+        etag = '"%s"' % hashlib.sha1(validador.encode('utf-8')).hexdigest()
+        encabezados = {'ETag': etag}
+        if agregado['ultimo']:
+            encabezados['Last-Modified'] = http_date(agregado['ultimo'].timestamp())
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return self._con_encabezados(HttpResponseNotModified(), encabezados)
+
+        guardado = self.listas_cache.get(etag)
+        if guardado is not None:
+            contenido, content_type = guardado
+            return self._con_encabezados(HttpResponse(contenido, content_type=content_type), encabezados)
+
+        response = super().list(request, *args, **kwargs)
+        self._con_encabezados(response, encabezados)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda renderizada: self.listas_cache.set(
+                    etag, (renderizada.content, renderizada['Content-Type'])
+                )
+            )
+        return response
+
+    @staticmethod
+    def _con_encabezados(response, encabezados):
+        for clave, valor in encabezados.items():
+            response[clave] = valor
+        return response
@@ -1,24 +1,203 @@
 """
 Servicio para integración con API Docman
 """
+import copy
+import hashlib
+import mmap
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import logging
 
+from .cache import LRUCache
+from .instrumentacion import medir
+from .metricas import contar_docman
+
 logger = logging.getLogger(__name__)
 
+# Métodos que se pueden repetir sin efectos secundarios adicionales
+METODOS_IDEMPOTENTES = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# Respuestas de un Docman momentáneamente no disponible, que vale la pena reintentar
+CODIGOS_REINTENTO = frozenset([502, 503, 504])
+
+
+class DocmanError(Exception):
+    """Error de una petición a Docman en las APIs que no devuelven el dict de resultado"""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get('error') or f"Error {result.get('status_code')} en Docman API")
+        self.result = result
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de fallos.
+
+    - Cerrado: las llamadas pasan y se registra el resultado de las últimas
+      ``ventana``. Si hay al menos ``min_llamadas`` y la proporción de fallos
+      alcanza ``umbral``, se abre.
+    - Abierto: las llamadas fallan de inmediato durante ``espera`` segundos.
+    - Semiabierto: deja pasar una llamada de prueba; si funciona se cierra y
+      si falla vuelve a abrirse.
+    """
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, ventana: int = 20, min_llamadas: int = 10, umbral: float = 0.5,
+                 espera: float = 30):
+        self.min_llamadas = min_llamadas
+        self.umbral = umbral
+        self.espera = espera
+        self._resultados: deque = deque(maxlen=ventana)
+        self._estado = self.CERRADO
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == self.ABIERTO and time.monotonic() >= self._abierto_hasta:
+                return self.SEMIABIERTO
+            return self._estado
+
+    def permitir(self) -> bool:
+        """Indica si la llamada puede hacerse; en semiabierto solo pasa una a la vez"""
+        with self._lock:
+            if self._estado == self.CERRADO:
+                return True
+            if self._estado == self.ABIERTO:
+                if time.monotonic() < self._abierto_hasta:
+                    return False
+                self._estado = self.SEMIABIERTO
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar(self, exito: bool) -> None:
+        with self._lock:
+            if self._estado == self.SEMIABIERTO:
+                self._prueba_en_curso = False
+                if exito:
+                    self._estado = self.CERRADO
+                    self._resultados.clear()
+                else:
+                    self._abrir()
+                return
+            self._resultados.append(exito)
+            fallos = self._resultados.count(False)
+            if (len(self._resultados) >= self.min_llamadas
+                    and fallos / len(self._resultados) >= self.umbral):
+                self._abrir()
+
+    def _abrir(self) -> None:
+        if self._estado != self.ABIERTO:
+            logger.warning("Circuito de Docman abierto por %s segundos", self.espera)
+        self._estado = self.ABIERTO
+        self._abierto_hasta = time.monotonic() + self.espera
+        self._resultados.clear()
+
+
+class _Inmediato:
+    """Resultado ya disponible con la interfaz de un ``Future``"""
+
+    def __init__(self, valor):
+        self._valor = valor
+
+    def result(self):
+        return self._valor
+
 
 class DocmanAPIClient:
-    """Cliente para interactuar con la API de Docman"""
+    """
+    Cliente para interactuar con la API de Docman.
+
+    Mantiene una ``requests.Session`` por proceso con un pool de conexiones
+    keep-alive, así las peticiones seguidas reutilizan la conexión TCP/TLS.
+    Los métodos idempotentes se reintentan con backoff exponencial ante
+    errores de conexión y respuestas 502/503/504; un timeout no se reintenta,
+    porque ya esperó ``DOCMAN_TIMEOUT`` completo.
+
+    Un ``CircuitBreaker`` corta las llamadas mientras Docman está caído, para
+    no bloquear workers esperando ``DOCMAN_TIMEOUT``. Cada intento cuenta
+    como una llamada, así el circuito se abre aunque haya reintentos.
+
+    Con ``DOCMAN_CACHE_ENABLED``, ``get_document`` y ``list_documents`` se
+    guardan en una caché LRU del proceso. Pasado su TTL, una entrada con
+    ETag se revalida con ``If-None-Match``. Las escrituras hechas por este
+    cliente invalidan las entradas afectadas.
+    """
     
     def __init__(self):
         self.base_url = getattr(settings, 'DOCMAN_API_URL', '')
         self.api_key = getattr(settings, 'DOCMAN_API_KEY', '')
         self.timeout = getattr(settings, 'DOCMAN_TIMEOUT', 30)
+        self.pool_size = getattr(settings, 'DOCMAN_POOL_SIZE', 10)
+        self.max_retries = getattr(settings, 'DOCMAN_MAX_RETRIES', 3)
+        self.backoff = getattr(settings, 'DOCMAN_BACKOFF', 0.3)
+        self.bulk_concurrencia = getattr(settings, 'DOCMAN_BULK_CONCURRENCIA', self.pool_size)
+        self.iter_page_size = getattr(settings, 'DOCMAN_ITER_PAGE_SIZE', 100)
+        self.upload_chunk_size = getattr(settings, 'DOCMAN_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+        self.upload_mmap_min = getattr(settings, 'DOCMAN_UPLOAD_MMAP_MIN', 64 * 1024 * 1024)
+        self.cache_enabled = getattr(settings, 'DOCMAN_CACHE_ENABLED', False)
+        self.cache_ttl_documento = getattr(settings, 'DOCMAN_CACHE_TTL_DOCUMENTO', 60)
+        self.cache_ttl_listado = getattr(settings, 'DOCMAN_CACHE_TTL_LISTADO', 15)
+        cache_size = getattr(settings, 'DOCMAN_CACHE_SIZE', 1000)
+        self._cache_documentos = LRUCache(max_size=cache_size)
+        self._cache_listados = LRUCache(max_size=cache_size)
+        self._cache_version = 0
+        self._cache_lock = threading.Lock()
+        self._cache_contadores = {'hits': 0, 'misses': 0, 'revalidaciones': 0}
+        self.breaker = CircuitBreaker(
+            ventana=getattr(settings, 'DOCMAN_CB_VENTANA', 20),
+            min_llamadas=getattr(settings, 'DOCMAN_CB_MIN_LLAMADAS', 10),
+            umbral=getattr(settings, 'DOCMAN_CB_UMBRAL', 0.5),
+            espera=getattr(settings, 'DOCMAN_CB_ESPERA', 30),
+        )
+        self.health_ttl = getattr(settings, 'DOCMAN_HEALTH_TTL', 10)
+        self._health = None
+        self._health_verificado = 0.0
+        self._health_lock = threading.Lock()
+        self._health_refrescando = False
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
         
         if not self.base_url:
             logger.warning("DOCMAN_API_URL no está configurada")
+
+    @property
+    def session(self) -> requests.Session:
+        """Sesión del proceso actual (tras un fork no se comparten sockets con el padre)"""
+        if self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session_pid != os.getpid():
+                    self._session = self._crear_session()
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _crear_session(self) -> requests.Session:
+        # Sin reintentos en urllib3: los hace _make_request, pasando por el breaker
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=0,
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(self._get_headers())
+        return session
     
     def _get_headers(self, additional_headers: Optional[Dict] = None) -> Dict:
         """Genera los headers para las peticiones"""
@@ -39,7 +218,9 @@ class DocmanAPIClient:
         method: str, 
         endpoint: str, 
         data: Optional[Dict] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """
         Realiza una petición HTTP a la API de Docman
@@ -49,59 +230,200 @@ class DocmanAPIClient:
             endpoint: Endpoint de la API (sin la base URL)
             data: Datos a enviar en el body (para POST, PUT)
             params: Parámetros de query string
+            body: Cuerpo binario (en lugar de ``data``)
+            headers: Headers adicionales para esta petición
         
         Returns:
             Dict con la respuesta de la API
         """
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
-        
+        reintentos = self.max_retries if method.upper() in METODOS_IDEMPOTENTES else 0
+
+        for intento in range(reintentos + 1):
+            if intento:
+                time.sleep(self.backoff * (2 ** (intento - 1)))
+            result, reintentar = self._intentar(method, url, data, params, body, headers)
+            if not reintentar:
+                break
+        if not result['success'] and not result.get('circuit_open'):
+            logger.error(f"Error en petición a Docman API: {result['error']}")
+        return result
+
+    def _intentar(self, method, url, data, params, body, headers) -> Tuple[Dict[str, Any], bool]:
+        """
+        Un intento de la petición, registrado una sola vez en el breaker.
+
+        Devuelve el resultado y si vale la pena reintentar (error de conexión
+        o 502/503/504).
+        """
+        if not self.breaker.permitir():
+            contar_docman(method, None, 'circuito_abierto')
+            return {
+                'success': False,
+                'error': 'Docman no disponible (circuito abierto)',
+                'status_code': None,
+                'circuit_open': True
+            }, False
+
+        # Solo los errores del servidor cuentan como fallo; los 4xx son del pedido.
+        # El finally libera también la llamada de prueba del estado semiabierto
+        # si algo inesperado se lanza en el medio.
+        exito = False
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self._get_headers(),
-                json=data,
-                params=params,
-                timeout=self.timeout
+            try:
+                with medir('docman'):
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        json=data,
+                        data=body,
+                        params=params,
+                        headers=headers,
+                        timeout=self.timeout
+                    )
+            except requests.exceptions.RequestException as e:
+                contar_docman(method, None, 'conexion')
+                reintentar = not isinstance(e, requests.exceptions.Timeout)
+                return {'success': False, 'error': str(e), 'status_code': None}, reintentar
+
+            codigo = response.status_code
+            contar_docman(
+                method, codigo,
+                'http_5xx' if codigo >= 500 else 'http_4xx' if codigo >= 400 else None
             )
-            response.raise_for_status()
-            return {
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                exito = codigo < 500
+                return {'success': False, 'error': str(e), 'status_code': codigo}, codigo in CODIGOS_REINTENTO
+
+            try:
+                datos = response.json() if response.content else None
+            except ValueError as e:
+                return {'success': False, 'error': f'Respuesta inválida de Docman: {e}', 'status_code': codigo}, False
+            exito = True
+            result = {
                 'success': True,
-                'data': response.json() if response.content else None,
-                'status_code': response.status_code
-            }
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error en petición a Docman API: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'status_code': getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
+                'data': datos,
+                'status_code': codigo
             }
+            if response.headers.get('ETag'):
+                result['etag'] = response.headers['ETag']
+            return result, False
+        finally:
+            self.breaker.registrar(exito)
     
     # ============ MÉTODOS PARA DOCUMENTOS ============
     
     def upload_document(
         self, 
         file_path: str, 
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        chunk_size: Optional[int] = None,
+        upload_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Sube un documento a Docman
+        Sube un documento a Docman en bloques, sin cargarlo completo en memoria
+
+        Crea una sesión de subida, envía el archivo en bloques de
+        ``chunk_size`` bytes (cada uno con su SHA-256) y la completa. Los
+        archivos de más de ``DOCMAN_UPLOAD_MMAP_MIN`` bytes se leen con
+        ``mmap``. Si un bloque falla, se consulta qué bloques confirmó el
+        servidor y se continúa desde ahí. Si aun así falla, la respuesta
+        incluye ``upload_id``, que se puede pasar de nuevo para reanudar.
         
         Args:
             file_path: Ruta del archivo a subir
             metadata: Metadatos adicionales del documento
+            chunk_size: Tamaño de bloque (por defecto ``DOCMAN_UPLOAD_CHUNK_SIZE``)
+            upload_id: Sesión de subida a reanudar
         
         Returns:
             Dict con la respuesta de la API
         """
-        # TODO: Implementar según la especificación de Docman API
-        endpoint = "/documents/upload"
-        data = {
-            'file_path': file_path,
-            'metadata': metadata or {}
+        tamano = os.path.getsize(file_path)
+        chunk_size = chunk_size or self.upload_chunk_size
+
+        if upload_id is None:
+            result = self._make_request('POST', '/documents/uploads', data={
+                'filename': os.path.basename(file_path),
+                'size': tamano,
+                'chunk_size': chunk_size,
+                'metadata': metadata or {},
+            })
+            if not result['success']:
+                return result
+            upload_id = result['data']['upload_id']
+        else:
+            result = self._make_request('GET', f'/documents/uploads/{upload_id}')
+            if not result['success']:
+                return {**result, 'upload_id': upload_id}
+            chunk_size = result['data'].get('chunk_size', chunk_size)
+        confirmados = set(result['data'].get('received_chunks', []))
+
+        total_chunks = -(-tamano // chunk_size)
+        checksum = hashlib.sha256()
+        with open(file_path, 'rb') as archivo, self._abrir_contenido(archivo, tamano) as contenido:
+            for numero in range(total_chunks):
+                inicio = numero * chunk_size
+                bloque = contenido(inicio, min(chunk_size, tamano - inicio))
+                checksum.update(bloque)
+                if numero in confirmados:
+                    continue
+                result = self._subir_chunk(upload_id, numero, inicio, bloque, tamano, confirmados)
+                if not result['success']:
+                    return {**result, 'upload_id': upload_id}
+
+        result = self._make_request('POST', f'/documents/uploads/{upload_id}/complete', data={
+            'chunks': total_chunks,
+            'sha256': checksum.hexdigest(),
+        })
+        self._invalidar_documento(None)
+        if not result['success']:
+            result['upload_id'] = upload_id
+        return result
+
+    @contextmanager
+    def _abrir_contenido(self, archivo, tamano: int):
+        """Devuelve una función ``(inicio, largo) -> bytes`` sobre el archivo"""
+        if tamano >= self.upload_mmap_min:
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                yield lambda inicio, largo: mapa[inicio:inicio + largo]
+            return
+
+        def leer(inicio, largo):
+            archivo.seek(inicio)
+            return archivo.read(largo)
+        yield leer
+
+    def _subir_chunk(
+        self,
+        upload_id: str,
+        numero: int,
+        inicio: int,
+        bloque: bytes,
+        tamano: int,
+        confirmados: set
+    ) -> Dict[str, Any]:
+        """Envía un bloque; ante un error verifica si el servidor ya lo había recibido"""
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': f'bytes {inicio}-{inicio + len(bloque) - 1}/{tamano}',
+            'X-Chunk-SHA256': hashlib.sha256(bloque).hexdigest(),
         }
-        return self._make_request('POST', endpoint, data=data)
+        endpoint = f'/documents/uploads/{upload_id}/chunks/{numero}'
+        for intento in range(self.max_retries + 1):
+            result = self._make_request('PUT', endpoint, body=bloque, headers=headers)
+            if result['success']:
+                confirmados.add(numero)
+                return result
+            estado = self._make_request('GET', f'/documents/uploads/{upload_id}')
+            if estado['success']:
+                confirmados.update(estado['data'].get('received_chunks', []))
+                if numero in confirmados:
+                    return estado
+            time.sleep(self.backoff * (2 ** intento))
+        return result
     
     def get_document(self, document_id: str) -> Dict[str, Any]:
         """
@@ -114,7 +436,7 @@ class DocmanAPIClient:
             Dict con la respuesta de la API
         """
         endpoint = f"/documents/{document_id}"
-        return self._make_request('GET', endpoint)
+        return self._get_cacheado(self._cache_documentos, endpoint, None, self.cache_ttl_documento)
     
     def list_documents(
         self, 
@@ -139,7 +461,77 @@ class DocmanAPIClient:
             'page_size': page_size,
             **(filters or {})
         }
-        return self._make_request('GET', endpoint, params=params)
+        return self._get_cacheado(self._cache_listados, endpoint, params, self.cache_ttl_listado)
+    
+    def iter_documents(
+        self,
+        filters: Optional[Dict] = None,
+        page_size: Optional[int] = None,
+        max_items: Optional[int] = None,
+        prefetch: bool = True
+    ) -> Iterator[Dict]:
+        """
+        Recorre todos los documentos página por página
+        
+        Mientras se consume una página, la siguiente ya se está pidiendo en
+        segundo plano. Termina en la última página o al llegar a
+        ``max_items``. Si una página falla se lanza ``DocmanError``.
+        
+        Args:
+            filters: Filtros para la búsqueda
+            page_size: Tamaño de página (por defecto ``DOCMAN_ITER_PAGE_SIZE``)
+            max_items: Cantidad máxima de documentos a devolver
+            prefetch: Pedir la página siguiente por adelantado
+        
+        Yields:
+            Cada documento
+        """
+        page_size = page_size or self.iter_page_size
+        if max_items is not None:
+            page_size = max(1, min(page_size, max_items))
+        entregados = 0
+        ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='docman-iter') if prefetch else None
+
+        def pedir(page):
+            if ejecutor is None:
+                return _Inmediato(self.list_documents(filters, page=page, page_size=page_size))
+            return ejecutor.submit(self.list_documents, filters, page=page, page_size=page_size)
+
+        try:
+            page = 1
+            siguiente = pedir(page)
+            while True:
+                result = siguiente.result()
+                if not result['success']:
+                    raise DocmanError(result)
+                documentos, hay_mas = self._pagina_documentos(result['data'], page_size)
+                if hay_mas and (max_items is None or entregados + len(documentos) < max_items):
+                    siguiente = pedir(page + 1)
+                else:
+                    siguiente = None
+
+                for documento in documentos:
+                    if max_items is not None and entregados >= max_items:
+                        return
+                    entregados += 1
+                    yield documento
+                if siguiente is None:
+                    return
+                page += 1
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _pagina_documentos(data: Any, page_size: int) -> Tuple[List[Dict], bool]:
+        """Documentos de una respuesta de ``list_documents`` y si hay más páginas"""
+        if isinstance(data, list):
+            return data, len(data) >= page_size
+        data = data or {}
+        documentos = data.get('results') or []
+        if 'next' in data:
+            return documentos, bool(data['next']) and bool(documentos)
+        return documentos, len(documentos) >= page_size
     
     def delete_document(self, document_id: str) -> Dict[str, Any]:
         """
@@ -152,7 +544,9 @@ class DocmanAPIClient:
             Dict con la respuesta de la API
         """
         endpoint = f"/documents/{document_id}"
-        return self._make_request('DELETE', endpoint)
+        result = self._make_request('DELETE', endpoint)
+        self._invalidar_documento(endpoint)
+        return result
     
     def update_document_metadata(
         self, 
@@ -170,23 +564,225 @@ class DocmanAPIClient:
             Dict con la respuesta de la API
         """
         endpoint = f"/documents/{document_id}/metadata"
-        return self._make_request('PUT', endpoint, data=metadata)
-    
+        result = self._make_request('PUT', endpoint, data=metadata)
+        self._invalidar_documento(f"/documents/{document_id}")
+        return result
+
+    # ============ OPERACIONES MASIVAS ============
+
+    def _en_paralelo(
+        self,
+        funcion: Callable[..., Dict[str, Any]],
+        argumentos: List[tuple],
+        concurrencia: Optional[int] = None,
+        detener_en_error: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta ``funcion(*args)`` para cada elemento con a lo sumo
+        ``concurrencia`` peticiones en vuelo.
+
+        Devuelve un resultado por elemento, en el mismo orden de entrada. Con
+        ``detener_en_error`` se dejan de enviar peticiones tras el primer
+        error fatal (ver ``es_error_fatal``) y las no enviadas quedan con
+        ``cancelled: True``.
+        """
+        concurrencia = max(1, concurrencia or self.bulk_concurrencia)
+        resultados: List[Optional[Dict[str, Any]]] = [None] * len(argumentos)
+        pendientes = iter(enumerate(argumentos))
+        en_vuelo = {}
+        detenido = False
+
+        with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='docman') as ejecutor:
+            while True:
+                while not detenido and len(en_vuelo) < concurrencia:
+                    siguiente = next(pendientes, None)
+                    if siguiente is None:
+                        break
+                    indice, args = siguiente
+                    en_vuelo[ejecutor.submit(funcion, *args)] = indice
+                if not en_vuelo:
+                    break
+                terminados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    indice = en_vuelo.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except Exception as e:
+                        logger.error(f"Error en operación masiva de Docman: {str(e)}")
+                        resultado = {'success': False, 'error': str(e), 'status_code': None}
+                    resultados[indice] = resultado
+                    if detener_en_error and self.es_error_fatal(resultado):
+                        detenido = True
+
+        for indice, resultado in enumerate(resultados):
+            if resultado is None:
+                resultados[indice] = {
+                    'success': False,
+                    'error': 'Cancelado por un error previo',
+                    'status_code': None,
+                    'cancelled': True,
+                }
+        return resultados
+
+    @staticmethod
+    def es_error_fatal(resultado: Dict[str, Any]) -> bool:
+        """Errores que afectarán también al resto del lote: conexión, autenticación o 5xx"""
+        if resultado.get('success'):
+            return False
+        codigo = resultado.get('status_code')
+        return codigo is None or codigo in (401, 403) or codigo >= 500
+
+    def get_documents(
+        self,
+        document_ids: Iterable[str],
+        concurrencia: Optional[int] = None,
+        detener_en_error: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtiene varios documentos en paralelo
+
+        Returns:
+            Lista de respuestas (como ``get_document``) en el orden de ``document_ids``
+        """
+        return self._en_paralelo(
+            self.get_document, [(document_id,) for document_id in document_ids],
+            concurrencia, detener_en_error
+        )
+
+    def update_metadata_many(
+        self,
+        cambios: Union[Dict[str, Dict], Iterable[Tuple[str, Dict]]],
+        concurrencia: Optional[int] = None,
+        detener_en_error: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Actualiza los metadatos de varios documentos en paralelo
+
+        Args:
+            cambios: ``{document_id: metadata}`` o pares ``(document_id, metadata)``
+
+        Returns:
+            Lista de respuestas en el orden de ``cambios``
+        """
+        if isinstance(cambios, dict):
+            cambios = cambios.items()
+        return self._en_paralelo(
+            self.update_document_metadata, [tuple(cambio) for cambio in cambios],
+            concurrencia, detener_en_error
+        )
+
+    def delete_documents(
+        self,
+        document_ids: Iterable[str],
+        concurrencia: Optional[int] = None,
+        detener_en_error: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Elimina varios documentos en paralelo
+
+        Returns:
+            Lista de respuestas en el orden de ``document_ids``
+        """
+        return self._en_paralelo(
+            self.delete_document, [(document_id,) for document_id in document_ids],
+            concurrencia, detener_en_error
+        )
+
+    # ============ CACHÉ DE LECTURAS ============
+
+    def _get_cacheado(
+        self,
+        cache: LRUCache,
+        endpoint: str,
+        params: Optional[Dict],
+        ttl: float
+    ) -> Dict[str, Any]:
+        """GET servido desde la caché mientras está vigente; luego se revalida con ETag"""
+        if not self.cache_enabled:
+            return self._make_request('GET', endpoint, params=params)
+
+        clave = (endpoint, tuple(sorted((params or {}).items())))
+        entrada = cache.get(clave)
+        if entrada is not None and entrada['expira'] > time.monotonic():
+            self._contar('hits')
+            return copy.deepcopy(entrada['result'])
+
+        version = self._cache_version
+        headers = {'If-None-Match': entrada['result']['etag']} if entrada and 'etag' in entrada['result'] else None
+        result = self._make_request('GET', endpoint, params=params, headers=headers)
+
+        if headers and result.get('status_code') == 304:
+            self._contar('revalidaciones')
+            result = entrada['result']
+        else:
+            self._contar('misses')
+        if result['success'] and version == self._cache_version:
+            cache.set(clave, {'result': result, 'expira': time.monotonic() + ttl})
+        return copy.deepcopy(result)
+
+    def _contar(self, contador: str) -> None:
+        with self._cache_lock:
+            self._cache_contadores[contador] += 1
+
+    def _invalidar_documento(self, endpoint: Optional[str]) -> None:
+        """Descarta el documento y todos los listados (que pueden incluirlo)"""
+        if not self.cache_enabled:
+            return
+        with self._cache_lock:
+            self._cache_version += 1
+        if endpoint:
+            self._cache_documentos.delete((endpoint, ()))
+        self._cache_listados.clear()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Contadores de la caché para dimensionar ``DOCMAN_CACHE_SIZE``"""
+        with self._cache_lock:
+            stats = dict(self._cache_contadores)
+        stats['documentos'] = len(self._cache_documentos)
+        stats['listados'] = len(self._cache_listados)
+        return stats
+
+    def cache_clear(self) -> None:
+        with self._cache_lock:
+            self._cache_version += 1
+        self._cache_documentos.clear()
+        self._cache_listados.clear()
+
     # ============ MÉTODOS DE UTILIDAD ============
     
     def health_check(self) -> bool:
         """
         Verifica si la API de Docman está disponible
         
+        Devuelve el último resultado conocido. Si tiene más de
+        ``DOCMAN_HEALTH_TTL`` segundos se refresca en segundo plano, así la
+        llamada no espera a Docman (salvo la primera vez en el proceso).
+        
         Returns:
             True si la API responde correctamente
         """
+        if self._health is None:
+            self._refrescar_health()
+        elif time.monotonic() - self._health_verificado >= self.health_ttl:
+            with self._health_lock:
+                if self._health_refrescando:
+                    return self._health
+                self._health_refrescando = True
+            threading.Thread(
+                target=self._refrescar_health, name='docman-health', daemon=True
+            ).start()
+        return bool(self._health)
+
+    def _refrescar_health(self) -> None:
         try:
             result = self._make_request('GET', '/health')
-            return result.get('success', False)
+            self._health = result.get('success', False)
         except Exception as e:
             logger.error(f"Error en health check de Docman: {str(e)}")
-            return False
+            self._health = False
+        finally:
+            self._health_verificado = time.monotonic()
+            self._health_refrescando = False
 
 
 # Instancia singleton del cliente
@@ -0,0 +1,236 @@
+"""
+Servidor Docman falso en memoria para benchmarks y pruebas manuales.
+
+Implementa el subconjunto de la API que usa ``DocmanAPIClient`` sobre
+HTTP/1.1 con keep-alive. No se usa en producción.
+"""
+import hashlib
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+RUTA_DOCUMENTO = re.compile(r'^/documents/(?P<id>[^/]+)(?P<metadata>/metadata)?/?$')
+RUTA_SUBIDA = re.compile(r'^/documents/uploads/(?P<id>[^/]+)(?:/chunks/(?P<chunk>\d+)|/(?P<complete>complete))?/?$')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Encabezados y cuerpo se escriben por separado: sin esto Nagle retrasa
+    # cada respuesta keep-alive ~40 ms
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, codigo: int, datos=None) -> None:
+        # Un cuerpo sin leer quedaría en el socket y se tomaría como el
+        # comienzo de la siguiente petición keep-alive
+        self._leer_cuerpo()
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+        etag = None
+        if self.command == 'GET' and codigo == 200:
+            etag = '"%s"' % hashlib.sha1(cuerpo).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                codigo, cuerpo = 304, b''
+        self.send_response(codigo)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_cuerpo(self) -> bytes:
+        """Cuerpo de la petición; se lee del socket una sola vez"""
+        if self._cuerpo is None:
+            largo = int(self.headers.get('Content-Length') or 0)
+            self._cuerpo = self.rfile.read(largo) if largo else b''
+        return self._cuerpo
+
+    def _leer_json(self) -> Optional[Dict]:
+        cuerpo = self._leer_cuerpo()
+        return json.loads(cuerpo) if cuerpo else None
+
+    def _estado_subida(self, subida_id: str, subida: Dict) -> Dict:
+        return {
+            'upload_id': subida_id,
+            'size': subida['size'],
+            'chunk_size': subida['chunk_size'],
+            'received_chunks': sorted(subida['chunks']),
+        }
+
+    def _atender_subida(self, url) -> None:
+        servidor = self.server
+        if url.path.rstrip('/') == '/documents/uploads' and self.command == 'POST':
+            datos = self._leer_json() or {}
+            with servidor.lock:
+                subida_id = 'u%d' % next(servidor.secuencia)
+                servidor.subidas[subida_id] = {**datos, 'chunks': {}}
+                return self._responder(201, self._estado_subida(subida_id, servidor.subidas[subida_id]))
+
+        coincidencia = RUTA_SUBIDA.match(url.path)
+        subida_id = coincidencia.group('id') if coincidencia else None
+        subida = servidor.subidas.get(subida_id)
+        if subida is None:
+            return self._responder(404, {'detail': 'Subida no encontrada'})
+
+        if coincidencia.group('chunk') is not None and self.command == 'PUT':
+            numero = int(coincidencia.group('chunk'))
+            bloque = self._leer_cuerpo()
+            with servidor.lock:
+                if servidor.fallos.get(numero):
+                    servidor.fallos[numero] -= 1
+                    return self._responder(500, {'detail': 'Fallo simulado'})
+            if hashlib.sha256(bloque).hexdigest() != self.headers.get('X-Chunk-SHA256'):
+                return self._responder(400, {'detail': 'Checksum incorrecto'})
+            with servidor.lock:
+                subida['chunks'][numero] = bloque
+            return self._responder(200, {'chunk': numero, 'size': len(bloque)})
+
+        if coincidencia.group('complete') and self.command == 'POST':
+            datos = self._leer_json() or {}
+            contenido = b''.join(subida['chunks'][numero] for numero in sorted(subida['chunks']))
+            if hashlib.sha256(contenido).hexdigest() != datos.get('sha256'):
+                return self._responder(409, {'detail': 'El archivo no coincide'})
+            with servidor.lock:
+                documento_id = str(len(servidor.documentos) + 1)
+                while documento_id in servidor.documentos:
+                    documento_id = str(int(documento_id) + 1)
+                documento = {
+                    'id': documento_id,
+                    'nombre': subida.get('filename'),
+                    'size': len(contenido),
+                    'metadata': subida.get('metadata', {}),
+                }
+                servidor.documentos[documento_id] = documento
+                del servidor.subidas[subida_id]
+            return self._responder(201, documento)
+
+        if self.command == 'GET':
+            return self._responder(200, self._estado_subida(subida_id, subida))
+        return self._responder(405, {'detail': 'Método no permitido'})
+
+    def _atender(self) -> None:
+        servidor = self.server
+        self._cuerpo = None
+        with servidor.lock:
+            servidor.peticiones += 1
+            servidor.en_vuelo += 1
+            servidor.max_en_vuelo = max(servidor.max_en_vuelo, servidor.en_vuelo)
+            caido = servidor.caidas > 0
+            if caido:
+                servidor.caidas -= 1
+        try:
+            if servidor.latencia:
+                time.sleep(servidor.latencia)
+            if caido:
+                return self._responder(503, {'detail': 'Caída simulada'})
+            return self._despachar()
+        finally:
+            with servidor.lock:
+                servidor.en_vuelo -= 1
+
+    def _despachar(self) -> None:
+        servidor = self.server
+
+        url = urlparse(self.path)
+        if url.path == '/health':
+            return self._responder(200, {'status': 'ok'})
+        if url.path.startswith('/documents/uploads'):
+            return self._atender_subida(url)
+
+        if url.path.rstrip('/') == '/documents' and self.command == 'GET':
+            params = {clave: valores[0] for clave, valores in parse_qs(url.query).items()}
+            pagina = int(params.get('page', 1))
+            tamano = int(params.get('page_size', 10))
+            with servidor.lock:
+                documentos = sorted(servidor.documentos.values(), key=lambda doc: doc['id'])
+            inicio = (pagina - 1) * tamano
+            return self._responder(200, {
+                'count': len(documentos),
+                'page': pagina,
+                'page_size': tamano,
+                'next': pagina + 1 if inicio + tamano < len(documentos) else None,
+                'results': documentos[inicio:inicio + tamano],
+            })
+
+        coincidencia = RUTA_DOCUMENTO.match(url.path)
+        if not coincidencia:
+            return self._responder(404, {'detail': 'No encontrado'})
+        documento_id = coincidencia.group('id')
+        with servidor.lock:
+            documento = servidor.documentos.get(documento_id)
+            if documento is None:
+                return self._responder(404, {'detail': 'Documento no encontrado'})
+            if self.command == 'GET' and not coincidencia.group('metadata'):
+                return self._responder(200, documento)
+            if self.command == 'DELETE' and not coincidencia.group('metadata'):
+                del servidor.documentos[documento_id]
+                return self._responder(204)
+            if self.command == 'PUT' and coincidencia.group('metadata'):
+                documento['metadata'] = self._leer_json() or {}
+                return self._responder(200, documento)
+        return self._responder(405, {'detail': 'Método no permitido'})
+
+    do_GET = do_PUT = do_DELETE = do_POST = _atender
+
+
+class ServidorDocmanFalso(ThreadingHTTPServer):
+    """
+    Servidor Docman en un hilo aparte. Uso::
+
+        with ServidorDocmanFalso(documentos=100) as servidor:
+            cliente.base_url = servidor.url
+    """
+    daemon_threads = True
+
+    def __init__(self, documentos: int = 0, latencia: float = 0.0, puerto: int = 0):
+        super().__init__(('127.0.0.1', puerto), _Handler)
+        self.lock = threading.Lock()
+        self.latencia = latencia
+        self.conexiones = 0
+        self.peticiones = 0
+        # Peticiones atendiéndose a la vez: actual y máximo alcanzado
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.subidas: Dict[str, Dict] = {}
+        self.secuencia = itertools.count(1)
+        # Bloques que deben fallar con 500: {número de bloque: veces}
+        self.fallos: Dict[int, int] = {}
+        # Peticiones siguientes (de cualquier ruta) que responden 503
+        self.caidas = 0
+        self.documentos = {
+            str(numero): {'id': str(numero), 'nombre': f'documento-{numero}.pdf', 'metadata': {}}
+            for numero in range(1, documentos + 1)
+        }
+        self._hilo = None
+
+    def handle_error(self, request, client_address):
+        # El cliente cortó la conexión (por ejemplo tras su timeout)
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        return 'http://%s:%d' % self.server_address[:2]
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self.serve_forever, name='docman-falso', daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,431 @@
+"""
+Escritura de eventos de acceso.
+
+Todas las rutas que registran eventos pasan por ``registrar_evento`` o
+``registrar_eventos``. Con ``EVENTOS_WRITE_BEHIND`` activo, los eventos
+individuales se anotan en un journal local y un hilo en segundo plano los
+inserta con ``bulk_create``, así la respuesta no espera al INSERT.
+
+Cada escritura actualiza en la misma transacción los conteos por hora de
+``EventoResumenHora``. Los eventos que se editan o borran desde el admin, o
+al borrar su sensor, se descuentan con ``descontar_resumenes``; los que
+borra ``archivar_eventos`` conservan su conteo.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, Greatest, TruncHour
+from django.utils import timezone
+
+from .models import Evento, EventoResumenHora
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_EVENTO = (
+    'sensor_id', 'departamento_id', 'tipo', 'resultado', 'descripcion', 'usuario_id',
+)
+
+
+def _a_linea(campos: Dict[str, Any]) -> bytes:
+    fila = {campo: campos.get(campo) for campo in CAMPOS_EVENTO}
+    fila['creado_en'] = campos['creado_en'].isoformat()
+    return (json.dumps(fila, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _desde_linea(linea: bytes) -> Dict[str, Any]:
+    fila = json.loads(linea)
+    fila['creado_en'] = datetime.fromisoformat(fila['creado_en'])
+    return fila
+
+
+def _guardar(pendientes: List[Tuple[bytes, Dict[str, Any]]]) -> None:
+    # Modelos nuevos en cada intento: bulk_create deja el pk asignado aunque
+    # la transacción se revierta
+    eventos = [Evento(**campos) for _, campos in pendientes]
+    with transaction.atomic():
+        Evento.objects.bulk_create(eventos)
+        actualizar_resumenes(eventos)
+
+
+class EventoJournal:
+    """
+    Journal de escritura diferida para eventos.
+
+    Cada proceso anota sus eventos en su propio archivo ``eventos-<pid>-*.jsonl``
+    (bloqueado con ``flock`` mientras el proceso vive) y los encola en memoria.
+    El hilo de vaciado los inserta cada ``flush_ms`` milisegundos o cada
+    ``flush_filas`` eventos y guarda en ``<archivo>.ckpt`` hasta qué byte se
+    insertó. Al iniciar, los archivos de procesos terminados se reprocesan
+    desde su checkpoint, de modo que no se pierden eventos; si un proceso
+    muere entre el INSERT y el checkpoint, el último lote puede repetirse.
+
+    Si la base de datos no está disponible (``OperationalError``) el lote se
+    reintenta. Si el lote falla por sus datos (una FK que ya no existe, un
+    valor inválido) los eventos se insertan de a uno y los que siguen
+    fallando se anotan en ``descartados.jsonl`` con el error, para que no
+    bloqueen a los siguientes.
+    """
+
+    def __init__(self, directorio, flush_ms: int = 200, flush_filas: int = 500,
+                 max_cola: int = 10000):
+        self.directorio = Path(directorio)
+        self.flush_ms = flush_ms
+        self.flush_filas = flush_filas
+        self.max_cola = max_cola
+        self._cola: "queue.Queue" = queue.Queue()
+        self._espacio = threading.BoundedSemaphore(max_cola)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._archivo = None
+        self._ruta = None
+        self._offset = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # ============ CICLO DE VIDA ============
+
+    def iniciar(self) -> None:
+        """Reprocesa journals huérfanos y arranca el hilo de vaciado de este proceso"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if fcntl is None:
+                raise ImproperlyConfigured('EVENTOS_WRITE_BEHIND requiere un sistema POSIX (fcntl)')
+
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            self._reprocesar_huerfanos()
+
+            self._ruta = self.directorio / f'eventos-{os.getpid()}-{time.time_ns()}.jsonl'
+            self._archivo = open(self._ruta, 'ab')
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX)
+            self._offset = 0
+            self._guardar_checkpoint(self._ruta, 0)
+
+            # Tras un fork la cola heredada pertenece al proceso padre
+            self._cola = queue.Queue()
+            self._espacio = threading.BoundedSemaphore(self.max_cola)
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='evento-journal', daemon=True)
+            self._hilo.start()
+            self._pid = os.getpid()
+            atexit.register(self.detener)
+
+    def detener(self, timeout: float = 10) -> None:
+        """Vacía lo pendiente y detiene el hilo (se llama al salir del proceso)"""
+        if self._pid != os.getpid() or self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join(timeout)
+
+    # ============ ESCRITURA ============
+
+    def agregar(self, campos: Dict[str, Any]) -> None:
+        """Anota un evento en el journal y lo encola para insertarlo"""
+        self.iniciar()
+        linea = _a_linea(campos)
+        # Si la cola está llena se bloquea aquí, fuera del lock: contrapresión
+        # hacia las peticiones
+        self._espacio.acquire()
+        try:
+            with self._lock:
+                self._archivo.write(linea)
+                self._archivo.flush()
+                self._offset += len(linea)
+                # Encolado con el lock tomado: la cola queda en el orden del
+                # archivo y ``_vaciar`` nunca ve un offset que aún no se encoló
+                self._cola.put_nowait((linea, campos, self._offset))
+        except BaseException:
+            self._espacio.release()
+            raise
+
+    def _bucle(self) -> None:
+        while True:
+            lote = self._recolectar()
+            if lote:
+                self._vaciar(lote)
+            elif self._detener.is_set():
+                break
+        connection.close()
+
+    def _recolectar(self) -> List:
+        lote = []
+        limite = time.monotonic() + self.flush_ms / 1000
+        while len(lote) < self.flush_filas:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+            self._espacio.release()
+        return lote
+
+    def _vaciar(self, lote: List) -> None:
+        self._insertar([(linea, campos) for linea, campos, _ in lote], reintentar=True)
+
+        fin = lote[-1][2]
+        with self._lock:
+            if fin == self._offset:
+                # Todo lo anotado ya está en la base de datos: se compacta
+                self._archivo.truncate(0)
+                self._archivo.seek(0)
+                self._offset = fin = 0
+            self._guardar_checkpoint(self._ruta, fin)
+
+    def _insertar(self, pendientes: List[Tuple[bytes, Dict[str, Any]]], reintentar: bool) -> int:
+        """
+        Inserta los eventos ``(linea, campos)`` en un solo lote o, si el lote
+        falla por sus datos, de a uno, descartando los que siguen fallando.
+
+        Con ``reintentar`` los ``OperationalError`` se reintentan hasta que la
+        base responda; si no, se propagan. Devuelve cuántos se insertaron.
+        """
+        try:
+            self._guardar_lote(pendientes, reintentar)
+            return len(pendientes)
+        except OperationalError:
+            raise
+        except Exception:
+            if len(pendientes) > 1:
+                logger.warning('Lote de %d eventos rechazado; se inserta de a uno', len(pendientes))
+
+        insertados = 0
+        for pendiente in pendientes:
+            try:
+                self._guardar_lote([pendiente], reintentar)
+                insertados += 1
+            except OperationalError:
+                raise
+            except Exception as error:
+                self._descartar(pendiente[0], error)
+        return insertados
+
+    @staticmethod
+    def _guardar_lote(pendientes, reintentar: bool) -> None:
+        while True:
+            try:
+                return _guardar(pendientes)
+            except OperationalError:
+                connection.close()
+                if not reintentar:
+                    raise
+                # No se descartan eventos: se reintenta con una conexión nueva
+                logger.exception('Base de datos no disponible al vaciar el journal; reintentando')
+                time.sleep(1)
+
+    def _descartar(self, linea: bytes, error: Exception) -> None:
+        """Anota un evento que no se pudo insertar en ``descartados.jsonl``"""
+        logger.error('Evento descartado del journal (%r): %s', error, linea.decode('utf-8', 'replace').rstrip())
+        registro = json.dumps({
+            'linea': linea.decode('utf-8', 'replace').rstrip('\n'),
+            'error': repr(error),
+            'descartado_en': timezone.now().isoformat(),
+        }, separators=(',', ':')) + '\n'
+        try:
+            # Una sola escritura en modo append: las líneas de varios procesos no se mezclan
+            with open(self.directorio / 'descartados.jsonl', 'ab') as archivo:
+                archivo.write(registro.encode('utf-8'))
+        except OSError:
+            logger.exception('No se pudo escribir en descartados.jsonl')
+
+    # ============ RECUPERACIÓN ============
+
+    @staticmethod
+    def _ruta_checkpoint(ruta: Path) -> Path:
+        return ruta.with_name(ruta.name + '.ckpt')
+
+    def _guardar_checkpoint(self, ruta: Path, offset: int) -> None:
+        destino = self._ruta_checkpoint(ruta)
+        temporal = destino.with_name(destino.name + '.tmp')
+        temporal.write_text(str(offset))
+        os.replace(temporal, destino)
+
+    def _leer_checkpoint(self, ruta: Path) -> int:
+        try:
+            return int(self._ruta_checkpoint(ruta).read_text() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _reprocesar_huerfanos(self) -> None:
+        for ruta in sorted(self.directorio.glob('eventos-*.jsonl')):
+            try:
+                archivo = open(ruta, 'rb')
+            except OSError:
+                continue
+            with archivo:
+                try:
+                    fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # Pertenece a un proceso vivo
+                if os.fstat(archivo.fileno()).st_nlink == 0:
+                    continue  # Otro proceso ya lo reprocesó
+                try:
+                    self._reprocesar(ruta, archivo)
+                except OperationalError:
+                    # Se conserva con su checkpoint para el próximo arranque
+                    logger.exception('No se pudo reprocesar el journal %s', ruta.name)
+
+    def _reprocesar(self, ruta: Path, archivo) -> None:
+        offset = self._leer_checkpoint(ruta)
+        archivo.seek(offset)
+        pendientes = []
+        total = 0
+        for linea in archivo:
+            if not linea.endswith(b'\n'):
+                break  # Escritura interrumpida a mitad de línea
+            offset += len(linea)
+            try:
+                pendientes.append((linea, _desde_linea(linea)))
+            except (ValueError, KeyError, TypeError) as error:
+                self._descartar(linea, error)
+            if len(pendientes) >= self.flush_filas:
+                total += self._insertar(pendientes, reintentar=False)
+                self._guardar_checkpoint(ruta, offset)
+                pendientes = []
+
+        if pendientes:
+            total += self._insertar(pendientes, reintentar=False)
+        if total:
+            logger.info('Journal %s: %d eventos reprocesados', ruta.name, total)
+
+        ruta.unlink()
+        self._ruta_checkpoint(ruta).unlink(missing_ok=True)
+
+
+_journal: Optional[EventoJournal] = None
+
+
+def get_journal() -> Optional[EventoJournal]:
+    """Devuelve el journal del proceso, o None si la escritura diferida está desactivada"""
+    global _journal
+    if not getattr(settings, 'EVENTOS_WRITE_BEHIND', False):
+        return None
+    if _journal is None:
+        _journal = EventoJournal(
+            settings.EVENTOS_JOURNAL_DIR,
+            flush_ms=settings.EVENTOS_FLUSH_MS,
+            flush_filas=settings.EVENTOS_FLUSH_FILAS,
+            max_cola=settings.EVENTOS_COLA_MAX,
+        )
+    return _journal
+
+
+def iniciar_journal() -> None:
+    """Arranca el journal al iniciar el servidor para reprocesar lo pendiente"""
+    journal = get_journal()
+    if journal is not None:
+        journal.iniciar()
+
+
+def registrar_evento(**campos) -> Optional[Evento]:
+    """
+    Registra un evento.
+
+    Devuelve el Evento creado, o None si quedó en el journal de escritura
+    diferida (aún sin id).
+    """
+    campos.setdefault('creado_en', timezone.now())
+    journal = get_journal()
+    if journal is not None:
+        journal.agregar(campos)
+        return None
+    with transaction.atomic():
+        evento = Evento.objects.create(**campos)
+        actualizar_resumenes([evento])
+    return evento
+
+
+def registrar_eventos(eventos: List[Evento]) -> List[Evento]:
+    """Inserta varios eventos con un único ``bulk_create``"""
+    with transaction.atomic():
+        eventos = Evento.objects.bulk_create(eventos)
+        actualizar_resumenes(eventos)
+    return eventos
+
+
+def hora_resumen(fecha: datetime) -> datetime:
+    """Inicio de la hora (UTC) en la que cae ``fecha``"""
+    return fecha.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def actualizar_resumenes(eventos: Iterable[Evento]) -> None:
+    """
+    Suma los eventos a sus conteos por hora.
+
+    Debe llamarse dentro de la transacción que inserta los eventos. Hace un
+    UPDATE por combinación (departamento, tipo, resultado, hora) y solo crea
+    la fila cuando aún no existe.
+    """
+    conteos = Counter(
+        (evento.departamento_id, evento.tipo, evento.resultado or '', hora_resumen(evento.creado_en))
+        for evento in eventos
+    )
+    for (departamento_id, tipo, resultado, hora), total in conteos.items():
+        clave = {
+            'departamento_id': departamento_id,
+            'tipo': tipo,
+            'resultado': resultado,
+            'hora': hora,
+        }
+        if EventoResumenHora.objects.filter(**clave).update(total=F('total') + total):
+            continue
+        try:
+            with transaction.atomic():
+                EventoResumenHora.objects.create(total=total, **clave)
+        except IntegrityError:
+            # Otro proceso la creó entre el UPDATE y el INSERT
+            EventoResumenHora.objects.filter(**clave).update(total=F('total') + total)
+
+
+def conteos_por_hora(eventos):
+    """
+    Conteo de ``eventos`` por (departamento, tipo, resultado, hora), con las
+    mismas claves que ``EventoResumenHora``: un resultado NULL cuenta como ''.
+    """
+    return (
+        eventos
+        .order_by()
+        .annotate(
+            hora=TruncHour('creado_en', tzinfo=dt_timezone.utc),
+            resultado_clave=Coalesce('resultado', Value('')),
+        )
+        .values('departamento_id', 'tipo', 'resultado_clave', 'hora')
+        .annotate(total=Count('id'))
+    )
+
+
+def descontar_resumenes(eventos) -> None:
+    """
+    Resta los eventos del queryset de sus conteos por hora.
+
+    Debe llamarse dentro de la transacción que los borra o modifica, antes
+    de hacerlo.
+    """
+    for fila in conteos_por_hora(eventos):
+        EventoResumenHora.objects.using(eventos.db).filter(
+            departamento_id=fila['departamento_id'],
+            tipo=fila['tipo'],
+            resultado=fila['resultado_clave'],
+            hora=fila['hora'],
+        ).update(total=Greatest(F('total') - fila['total'], 0))
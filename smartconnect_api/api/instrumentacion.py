@@ -0,0 +1,190 @@
+"""
+Instrumentación por petición: tiempos de SQL, vista, render y Docman.
+
+``InstrumentacionMiddleware`` mide cada petición y publica el desglose en
+el encabezado ``Server-Timing`` (visible en las herramientas de desarrollo
+del navegador) y en una línea de log JSON del logger ``api.instrumentacion``.
+Además puede guardar perfiles de cProfile de una fracción de las peticiones.
+
+Se configura con:
+
+- ``INSTRUMENTACION_ACTIVA``: mide, agrega ``Server-Timing`` y registra el log.
+- ``INSTRUMENTACION_PERFIL_FRACCION``: fracción de peticiones perfiladas (0-1).
+- ``INSTRUMENTACION_PERFIL_RUTA``: solo se perfilan las rutas con este prefijo.
+- ``INSTRUMENTACION_PERFIL_DIR``: directorio de los archivos ``.prof``.
+
+Con todo desactivado el middleware se quita de la cadena al arrancar.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api.instrumentacion')
+
+
+class Medicion:
+    """Tiempos acumulados (en segundos) y cantidad de llamadas de una petición"""
+    __slots__ = ('tiempos', 'llamadas')
+
+    def __init__(self):
+        self.tiempos = {}
+        self.llamadas = {}
+
+    def sumar(self, nombre: str, segundos: float) -> None:
+        self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + segundos
+        self.llamadas[nombre] = self.llamadas.get(nombre, 0) + 1
+
+
+_actual: ContextVar[Optional[Medicion]] = ContextVar('medicion', default=None)
+
+
+@contextmanager
+def medir(nombre: str):
+    """Suma la duración del bloque a ``nombre`` en la petición en curso (si se está midiendo)"""
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+def _contar_sql(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sumar('db', time.perf_counter() - inicio)
+
+
+class InstrumentacionMiddleware:
+    """
+    Ubicarlo primero en ``MIDDLEWARE`` para que ``total`` incluya al resto.
+
+    ``vista`` va desde que se resuelve la vista hasta que devuelve la
+    respuesta (incluye la serialización, que también se informa aparte como
+    ``serializacion`` en los listados) y ``render`` es la codificación de
+    las respuestas de DRF y plantillas. Lo que se consume después de
+    devolver la respuesta (streaming) no se mide.
+    """
+
+    def __init__(self, get_response):
+        self.activa = settings.INSTRUMENTACION_ACTIVA
+        self.fraccion_perfil = settings.INSTRUMENTACION_PERFIL_FRACCION
+        if not self.activa and self.fraccion_perfil <= 0:
+            raise MiddlewareNotUsed()
+        self.ruta_perfil = settings.INSTRUMENTACION_PERFIL_RUTA
+        self.dir_perfil = settings.INSTRUMENTACION_PERFIL_DIR
+        self.get_response = get_response
+
+    def __call__(self, request):
+        perfil = self._iniciar_perfil(request)
+        try:
+            if self.activa:
+                return self._medir(request)
+            return self.get_response(request)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+                self._guardar_perfil(perfil, request)
+
+    def _medir(self, request):
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        request._instrumentacion = {}
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for alias in connections:
+                    pila.enter_context(connections[alias].execute_wrapper(_contar_sql))
+                response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        fin = time.perf_counter()
+
+        marcas = request._instrumentacion
+        if 'vista' in marcas:
+            medicion.tiempos['vista'] = marcas.get('fin_vista', fin) - marcas['vista']
+        if 'fin_vista' in marcas and 'fin_render' in marcas:
+            medicion.tiempos['render'] = marcas['fin_render'] - marcas['fin_vista']
+        medicion.tiempos['total'] = fin - inicio
+
+        response['Server-Timing'] = ', '.join(
+            '%s;dur=%.2f%s' % (
+                nombre, segundos * 1000,
+                ';desc="n=%d"' % medicion.llamadas[nombre] if nombre in medicion.llamadas else ''
+            )
+            for nombre, segundos in medicion.tiempos.items()
+        )
+        logger.info(json.dumps(self._registro(request, response, medicion), ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marcas = getattr(request, '_instrumentacion', None)
+        if marcas is not None:
+            marcas['vista'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Último process_template_response de la cadena: la vista ya terminó
+        # y a continuación Django renderiza la respuesta
+        marcas = getattr(request, '_instrumentacion', None)
+        if marcas is not None:
+            marcas['fin_vista'] = time.perf_counter()
+            response.add_post_render_callback(
+                lambda renderizada: marcas.__setitem__('fin_render', time.perf_counter())
+            )
+        return response
+
+    @staticmethod
+    def _registro(request, response, medicion):
+        match = getattr(request, 'resolver_match', None)
+        registro = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': match.view_name if match else None,
+            'estado': response.status_code,
+        }
+        for nombre, segundos in medicion.tiempos.items():
+            registro[f'{nombre}_ms'] = round(segundos * 1000, 2)
+        for nombre, llamadas in medicion.llamadas.items():
+            registro[f'{nombre}_llamadas'] = llamadas
+        return registro
+
+    def _iniciar_perfil(self, request):
+        if self.fraccion_perfil <= 0 or random.random() >= self.fraccion_perfil:
+            return None
+        if not request.path.startswith(self.ruta_perfil):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo en este hilo
+            return None
+        return perfil
+
+    def _guardar_perfil(self, perfil, request):
+        nombre = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'raiz'
+        ruta = os.path.join(self.dir_perfil, f'{nombre}-{os.getpid()}-{time.time_ns()}.prof')
+        try:
+            os.makedirs(self.dir_perfil, exist_ok=True)
+            perfil.dump_stats(ruta)
+        except OSError as error:
+            logger.warning('No se pudo guardar el perfil %s: %s', ruta, error)
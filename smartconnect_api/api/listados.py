@@ -0,0 +1,126 @@
+"""
+Listados de solo lectura construidos con ``.values()``
+
+Para los listados JSON de eventos y sensores, serializar campo por campo con
+DRF y crear los modelos se lleva la mayor parte del tiempo. Aquí las filas
+salen directamente de ``.values()`` con los mismos nombres y formatos que el
+serializer, por lo que la respuesta es idéntica byte a byte.
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+from django.db import models
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .exportacion import COLUMNAS as COLUMNAS_EVENTOS
+from .instrumentacion import medir
+from .models import Evento, Sensor
+
+
+def fecha_iso(valor):
+    """Mismo texto que ``serializers.DateTimeField``: hora local en ISO 8601"""
+    if valor is None:
+        return None
+    if timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    texto = valor.isoformat()
+    if texto.endswith('+00:00'):
+        texto = texto[:-6] + 'Z'
+    return texto
+
+
+class FilasValores:
+    """
+    Convierte filas de ``.values()`` en los dict que produciría el serializer.
+
+    ``columnas`` son pares (nombre en la respuesta, campo del ORM). Como en
+    DRF, un campo de un modelo relacionado (``usuario__username``) se omite
+    de la fila cuando la relación es nula, y las fechas se formatean con
+    ``fecha_iso``.
+    """
+
+    def __init__(self, modelo, columnas: Sequence[Tuple[str, str]]):
+        self.columnas = tuple(columnas)
+        campos = [campo for _, campo in self.columnas]
+        self.fechas = []
+        self.omitir = []
+        for nombre, campo in self.columnas:
+            if '__' in campo:
+                relacion = modelo._meta.get_field(campo.split('__')[0])
+                if relacion.null:
+                    self.omitir.append((nombre, relacion.attname))
+                    if relacion.attname not in campos:
+                        campos.append(relacion.attname)
+            elif isinstance(modelo._meta.get_field(campo), models.DateTimeField):
+                self.fechas.append(nombre)
+        self.campos = tuple(campos)
+        # Un campo del ORM con otro nombre en la respuesta distingue las filas
+        # de ``.values()`` de las que ya vienen serializadas
+        self.marca = next(campo for nombre, campo in self.columnas if nombre != campo)
+
+    def valores(self, queryset):
+        return queryset.values(*self.campos)
+
+    def fila(self, valores: dict) -> dict:
+        fila = {nombre: valores[campo] for nombre, campo in self.columnas}
+        for nombre in self.fechas:
+            fila[nombre] = fecha_iso(fila[nombre])
+        for nombre, relacion in self.omitir:
+            if valores[relacion] is None:
+                del fila[nombre]
+        return fila
+
+    def filas(self, filas: Iterable[dict]) -> List[dict]:
+        """Convierte las filas de ``.values()``; las ya serializadas se dejan igual"""
+        marca = self.marca
+        return [self.fila(fila) if marca in fila else fila for fila in filas]
+
+
+class ListaRapidaMixin:
+    """
+    ``list`` que, para las respuestas JSON, usa ``filas_rapidas`` en lugar
+    del serializer. La API navegable sigue usando el serializer.
+    """
+    filas_rapidas: FilasValores = None
+
+    def usa_lista_rapida(self) -> bool:
+        return (
+            self.filas_rapidas is not None
+            and getattr(self.request, 'accepted_renderer', None) is not None
+            and self.request.accepted_renderer.format == 'json'
+        )
+
+    def queryset_lista(self, queryset):
+        if self.usa_lista_rapida():
+            return self.filas_rapidas.valores(queryset)
+        return queryset
+
+    def serializar_lista(self, filas):
+        with medir('serializacion'):
+            if self.usa_lista_rapida():
+                return self.filas_rapidas.filas(filas)
+            return self.get_serializer(filas, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.queryset_lista(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serializar_lista(page))
+        return Response(self.serializar_lista(queryset))
+
+
+# Mismos campos que EventoSerializer y SensorSerializer
+FILAS_EVENTOS = FilasValores(Evento, COLUMNAS_EVENTOS)
+FILAS_SENSORES = FilasValores(Sensor, (
+    ('id', 'id'),
+    ('uid', 'uid'),
+    ('nombre', 'nombre'),
+    ('tipo', 'tipo'),
+    ('estado', 'estado'),
+    ('usuario_asignado', 'usuario_asignado_id'),
+    ('usuario_asignado_username', 'usuario_asignado__username'),
+    ('departamento', 'departamento_id'),
+    ('departamento_nombre', 'departamento__nombre'),
+    ('creado_en', 'creado_en'),
+    ('actualizado_en', 'actualizado_en'),
+))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archivo import archivar_eventos, corte_retencion, directorio_archivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los eventos más antiguos que la retención configurada a archivos '
+        'NDJSON comprimidos por mes y los borra en lotes. Pensado para cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=settings.EVENTOS_RETENCION_DIAS,
+            help='Archivar eventos con más de estos días (por defecto EVENTOS_RETENCION_DIAS)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=settings.EVENTOS_ARCHIVO_LOTE,
+            help='Eventos por lote/transacción'
+        )
+        parser.add_argument(
+            '--pausa-ms', type=int, default=50,
+            help='Pausa entre lotes para no acaparar el bloqueo de escritura'
+        )
+
+    def handle(self, *args, **options):
+        corte = corte_retencion(options['dias'])
+        total = archivar_eventos(corte, lote=options['lote'], pausa=options['pausa_ms'] / 1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} eventos anteriores a {corte:%Y-%m-%d %H:%M} UTC archivados en {directorio_archivo()}'
+        ))
@@ -0,0 +1,197 @@
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Sensor
+
+ESCENARIOS = ('registrar_acceso', 'eventos', 'por_sensor')
+
+
+class _ClienteLocal:
+    """Cliente de pruebas de Django (en el proceso, cuenta las consultas)"""
+
+    def __init__(self, token):
+        extra = {}
+        hosts = [host for host in settings.ALLOWED_HOSTS if host]
+        if hosts and '*' not in hosts:
+            # 'testserver' no está en ALLOWED_HOSTS fuera de los tests
+            extra['HTTP_HOST'] = hosts[0].lstrip('.')
+        self.cliente = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_ACCEPT='application/json', **extra)
+
+    def peticion(self, metodo, url, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            if metodo == 'post':
+                respuesta = self.cliente.post(url, json.dumps(datos), content_type='application/json')
+            else:
+                respuesta = self.cliente.get(url)
+        return respuesta.status_code, len(consultas)
+
+    def cerrar(self):
+        connections.close_all()
+
+
+class _ClienteHTTP:
+    """Cliente contra un servidor en marcha (no cuenta las consultas)"""
+
+    def __init__(self, token, base):
+        self.base = base.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f'Bearer {token}', 'Accept': 'application/json'})
+
+    def peticion(self, metodo, url, datos):
+        if metodo == 'post':
+            respuesta = self.session.post(self.base + url, json=datos)
+        else:
+            respuesta = self.session.get(self.base + url)
+        respuesta.content
+        return respuesta.status_code, None
+
+    def cerrar(self):
+        self.session.close()
+
+
+def _percentiles(latencias):
+    if len(latencias) < 2:
+        valor = round(latencias[0] * 1000, 2) if latencias else None
+        return {'p50': valor, 'p95': valor, 'p99': valor, 'max': valor}
+    cortes = statistics.quantiles(latencias, n=100, method='inclusive')
+    return {
+        'p50': round(cortes[49] * 1000, 2),
+        'p95': round(cortes[94] * 1000, 2),
+        'p99': round(cortes[98] * 1000, 2),
+        'max': round(max(latencias) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de la API de accesos: registrar_acceso, listado de eventos y '
+        'eventos por sensor, con N peticiones a la concurrencia indicada, con el '
+        'cliente de pruebas de Django (en el proceso) o contra un servidor '
+        '(--url). Reporta en JSON peticiones por segundo, latencias p50/p95/p99 '
+        'y consultas por petición (solo en el proceso). registrar_acceso escribe '
+        'eventos reales: usar sobre datos de prueba (ver poblar_datos).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenario', action='append', choices=ESCENARIOS,
+                            help='Escenario a medir (se puede repetir; por defecto todos)')
+        parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por escenario')
+        parser.add_argument('--concurrencia', type=int, default=4, help='Hilos que envían peticiones')
+        parser.add_argument('--calentamiento', type=int, default=20, help='Peticiones previas sin medir')
+        parser.add_argument('--url', help='URL base de un servidor en marcha (p. ej. http://127.0.0.1:8000)')
+        parser.add_argument('--usuario', help='Usuario con el que autenticarse (por defecto el primer superusuario)')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--semilla', type=int)
+        parser.add_argument('--salida', help='Guardar también el reporte JSON en este archivo')
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.filter(is_active=True)
+        if options['usuario']:
+            usuario = usuarios.filter(username=options['usuario']).first()
+        else:
+            usuario = usuarios.filter(is_superuser=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No se encontró el usuario para autenticarse')
+        sensores = list(Sensor.objects.order_by('?').values_list('id', 'uid', 'departamento_id')[:5000])
+        if not sensores:
+            raise CommandError('No hay sensores: crear datos con poblar_datos')
+
+        token = str(AccessToken.for_user(usuario))
+        azar = random.Random(options['semilla'])
+        page_size = options['page_size']
+        generadores = {
+            'registrar_acceso': lambda sensor: (
+                'post', '/api/sensores/registrar_acceso/', {'uid': sensor[1], 'departamento_id': sensor[2]}
+            ),
+            'eventos': lambda sensor: ('get', f'/api/eventos/?page_size={page_size}', None),
+            'por_sensor': lambda sensor: (
+                'get', f'/api/eventos/por_sensor/?sensor_id={sensor[0]}&page_size={page_size}', None
+            ),
+        }
+
+        reporte = {
+            'modo': 'servidor' if options['url'] else 'cliente_django',
+            'url': options['url'],
+            'concurrencia': options['concurrencia'],
+            'peticiones': options['peticiones'],
+            'escenarios': {},
+        }
+        for escenario in options['escenario'] or ESCENARIOS:
+            generar = generadores[escenario]
+            peticiones = [generar(azar.choice(sensores)) for _ in range(options['peticiones'])]
+            calentamiento = [generar(azar.choice(sensores)) for _ in range(options['calentamiento'])]
+            reporte['escenarios'][escenario] = self._medir(
+                peticiones, calentamiento, options['concurrencia'], token, options['url']
+            )
+
+        salida = json.dumps(reporte, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+        self.stdout.write(salida)
+
+    @staticmethod
+    def _medir(peticiones, calentamiento, concurrencia, token, url):
+        siguiente = itertools.count()
+        resultados = []
+        errores = []
+
+        def trabajador():
+            cliente = _ClienteHTTP(token, url) if url else _ClienteLocal(token)
+            propios = []
+            try:
+                for peticion in calentamiento[:max(1, len(calentamiento) // concurrencia)]:
+                    cliente.peticion(*peticion)
+                barrera.wait()
+                # next() de itertools.count es atómico con el GIL
+                for indice in siguiente:
+                    if indice >= len(peticiones):
+                        break
+                    inicio = time.perf_counter()
+                    codigo, consultas = cliente.peticion(*peticiones[indice])
+                    propios.append((time.perf_counter() - inicio, codigo, consultas))
+            except Exception as error:
+                errores.append(repr(error))
+                barrera.abort()
+            finally:
+                cliente.cerrar()
+                resultados.extend(propios)
+
+        barrera = threading.Barrier(concurrencia + 1)
+        hilos = [threading.Thread(target=trabajador) for _ in range(concurrencia)]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            barrera.wait()
+        except threading.BrokenBarrierError:
+            pass
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        latencias = [latencia for latencia, _, _ in resultados]
+        consultas = [n for _, _, n in resultados if n is not None]
+        return {
+            'completadas': len(resultados),
+            'errores': errores,
+            'codigos': dict(Counter(str(codigo) for _, codigo, _ in resultados)),
+            'segundos': round(duracion, 3),
+            'peticiones_por_segundo': round(len(resultados) / duracion, 1) if duracion else None,
+            'latencia_ms': _percentiles(latencias),
+            'consultas_por_peticion': round(statistics.mean(consultas), 2) if consultas else None,
+        }
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from api.docman_service import DocmanAPIClient
+from api.docman_stub import ServidorDocmanFalso
+
+
+def _sin_pool(cliente: DocmanAPIClient, documento_id: str) -> bool:
+    """Camino anterior: ``requests.request`` abre una conexión nueva por llamada"""
+    respuesta = requests.request(
+        method='GET',
+        url=f"{cliente.base_url}/documents/{documento_id}",
+        headers=cliente._get_headers(),
+        timeout=cliente.timeout,
+    )
+    return respuesta.ok
+
+
+def _con_pool(cliente: DocmanAPIClient, documento_id: str) -> bool:
+    return cliente.get_document(documento_id)['success']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara contra un servidor Docman falso local el cliente con sesión '
+        'keep-alive y el camino anterior sin pool de conexiones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=1000, help='Llamadas a get_document por camino')
+        parser.add_argument('--hilos', type=int, default=4, help='Llamadas concurrentes')
+        parser.add_argument('--latencia-ms', type=float, default=0, help='Latencia simulada del servidor')
+
+    def handle(self, *args, **options):
+        peticiones = options['peticiones']
+        with ServidorDocmanFalso(documentos=100, latencia=options['latencia_ms'] / 1000) as servidor:
+            cliente = DocmanAPIClient()
+            cliente.base_url = servidor.url
+            cliente.pool_size = max(cliente.pool_size, options['hilos'])
+
+            for nombre, funcion in (('sin pool', _sin_pool), ('sesión con pool', _con_pool)):
+                servidor.conexiones = 0
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['hilos']) as ejecutor:
+                    resultados = list(ejecutor.map(
+                        lambda numero: funcion(cliente, str(numero % 100 + 1)), range(peticiones)
+                    ))
+                duracion = time.perf_counter() - inicio
+                self.stdout.write(
+                    f'{nombre:>16}: {peticiones / duracion:8.0f} req/s  '
+                    f'{duracion * 1000 / peticiones:6.2f} ms/req  '
+                    f'{servidor.conexiones:5d} conexiones  '
+                    f'{resultados.count(False)} errores'
+                )
@@ -0,0 +1,97 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.listados import FILAS_EVENTOS, FILAS_SENSORES
+from api.models import Departamento, Evento, Sensor
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import EventoSerializer, SensorSerializer
+
+# Textos con acentos, comillas y separadores de línea Unicode para comparar los bytes
+DESCRIPCIONES = ('Acceso permitido', 'Tarjeta de Ñuñoa "invitado"', 'Línea\u2028separada\u2029', '')
+
+
+def _mejor_tiempo(funcion, repeticiones):
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark de los listados de eventos y sensores: filas por '
+        'segundo con el serializer de DRF + JSONRenderer frente a .values() + '
+        'FastJSONRenderer, y si ambos producen los mismos bytes. Los datos de '
+        'prueba se crean en una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=2000, help='Eventos y sensores a crear')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Se reporta la mejor')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        with transaction.atomic():
+            marca = time.time_ns()
+            departamento = Departamento.objects.create(nombre=f'Benchmark listados {marca}')
+            usuario = User.objects.create(username=f'bench-{marca}')
+            sensores = Sensor.objects.bulk_create(
+                Sensor(
+                    uid=f'BENCH-{marca}-{indice}', nombre=f'Sensor {indice}', tipo='tarjeta',
+                    departamento=departamento, usuario_asignado=usuario if indice % 2 else None,
+                )
+                for indice in range(filas)
+            )
+            Evento.objects.bulk_create(
+                Evento(
+                    sensor=sensores[indice % len(sensores)], departamento=departamento,
+                    tipo='acceso_permitido', resultado='permitido',
+                    descripcion=DESCRIPCIONES[indice % len(DESCRIPCIONES)],
+                    usuario=usuario if indice % 3 else None,
+                )
+                for indice in range(filas)
+            )
+
+            reporte = {'orjson': orjson is not None, 'filas': filas}
+            for nombre, queryset, serializer, filas_rapidas in (
+                ('eventos', Evento.objects.filter(departamento=departamento)
+                    .select_related('sensor', 'departamento', 'usuario'), EventoSerializer, FILAS_EVENTOS),
+                ('sensores', Sensor.objects.filter(departamento=departamento)
+                    .select_related('departamento', 'usuario_asignado'), SensorSerializer, FILAS_SENSORES),
+            ):
+                queryset = queryset.order_by('-id')
+                lento, datos = _mejor_tiempo(
+                    lambda: serializer(list(queryset), many=True).data, options['repeticiones']
+                )
+                rapido, filas_valores = _mejor_tiempo(
+                    lambda: filas_rapidas.filas(filas_rapidas.valores(queryset)), options['repeticiones']
+                )
+                render_lento, contenido = _mejor_tiempo(
+                    lambda: JSONRenderer().render(datos), options['repeticiones']
+                )
+                render_rapido, contenido_rapido = _mejor_tiempo(
+                    lambda: FastJSONRenderer().render(filas_valores), options['repeticiones']
+                )
+                reporte[nombre] = {
+                    'serializer_filas_por_segundo': round(filas / lento),
+                    'values_filas_por_segundo': round(filas / rapido),
+                    'render_json_filas_por_segundo': round(filas / render_lento),
+                    'render_rapido_filas_por_segundo': round(filas / render_rapido),
+                    'total_filas_por_segundo': {
+                        'serializer': round(filas / (lento + render_lento)),
+                        'values': round(filas / (rapido + render_rapido)),
+                    },
+                    'bytes_identicos': contenido == contenido_rapido,
+                }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(reporte, indent=2))
@@ -0,0 +1,119 @@
+import json
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from api.eventos import registrar_evento
+from api.models import Departamento, Evento, Sensor
+
+
+def _escritor(sensor_id, departamento_id, segundos, resultados):
+    connections.close_all()  # No reutilizar la conexión heredada del proceso padre
+    escritos = bloqueos = 0
+    latencias = []
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        inicio = time.perf_counter()
+        try:
+            registrar_evento(
+                sensor_id=sensor_id,
+                departamento_id=departamento_id,
+                tipo='acceso_permitido',
+                resultado='permitido',
+                descripcion='Prueba de estrés',
+            )
+            escritos += 1
+            latencias.append(time.perf_counter() - inicio)
+        except OperationalError:
+            bloqueos += 1
+    connections.close_all()
+    resultados.put({'escritos': escritos, 'bloqueos': bloqueos, 'latencias': latencias})
+
+
+def _lector(departamento_id, segundos, resultados):
+    connections.close_all()
+    lecturas = bloqueos = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        try:
+            list(Evento.objects.filter(departamento_id=departamento_id).order_by('-creado_en', '-id')[:50])
+            lecturas += 1
+        except OperationalError:
+            bloqueos += 1
+    connections.close_all()
+    resultados.put({'lecturas': lecturas, 'bloqueos': bloqueos})
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de concurrencia: N procesos insertan eventos (y M procesos leen) '
+        'sobre la base configurada durante unos segundos y reporta escrituras por '
+        'segundo y errores "database is locked". Crea un departamento y un sensor '
+        'propios y los borra al terminar junto con sus eventos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=4, help='Procesos escritores')
+        parser.add_argument('--lectores', type=int, default=2, help='Procesos lectores')
+        parser.add_argument('--segundos', type=float, default=10)
+
+    def handle(self, *args, **options):
+        marca = time.time_ns()
+        departamento = Departamento.objects.create(nombre=f'Estrés SQLite {marca}')
+        sensor = Sensor.objects.create(
+            uid=f'ESTRES-{marca}', nombre='Estrés', tipo='tarjeta', departamento=departamento
+        )
+        modo = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                modo = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        connections.close_all()
+
+        contexto = multiprocessing.get_context('fork')
+        resultados = contexto.Queue()
+        procesos = [
+            contexto.Process(target=_escritor, args=(sensor.id, departamento.id, options['segundos'], resultados))
+            for _ in range(options['procesos'])
+        ] + [
+            contexto.Process(target=_lector, args=(departamento.id, options['segundos'], resultados))
+            for _ in range(options['lectores'])
+        ]
+        inicio = time.monotonic()
+        for proceso in procesos:
+            proceso.start()
+        parciales = [resultados.get() for _ in procesos]
+        for proceso in procesos:
+            proceso.join()
+        duracion = time.monotonic() - inicio
+
+        try:
+            latencias = [latencia for parcial in parciales for latencia in parcial.get('latencias', [])]
+            escritos = sum(parcial.get('escritos', 0) for parcial in parciales)
+            reporte = {
+                'journal_mode': modo,
+                'procesos': options['procesos'],
+                'lectores': options['lectores'],
+                'segundos': round(duracion, 2),
+                'escrituras': escritos,
+                'escrituras_por_segundo': round(escritos / duracion, 1),
+                'lecturas_por_segundo': round(sum(parcial.get('lecturas', 0) for parcial in parciales) / duracion, 1),
+                'errores_bloqueo': sum(parcial['bloqueos'] for parcial in parciales),
+                'latencia_escritura_ms': {
+                    'p50': round(_percentil(latencias, 50) * 1000, 2) if latencias else None,
+                    'p99': round(_percentil(latencias, 99) * 1000, 2) if latencias else None,
+                    'max': round(max(latencias) * 1000, 2) if latencias else None,
+                },
+            }
+        finally:
+            sensor.delete()  # Borra sus eventos en cascada
+            departamento.delete()
+        self.stdout.write(json.dumps(reporte, indent=2))
@@ -0,0 +1,164 @@
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.cache import acceso_cache
+from api.models import Barrera, Departamento, Evento, Sensor
+from api.views import MOTIVOS_DENEGACION
+
+# Accesos por hora del día (hora local): madrugada tranquila, picos de
+# entrada (8-9 h), almuerzo (13 h) y regreso (18-19 h)
+PESO_HORA = (
+    1, 0.5, 0.3, 0.3, 0.5, 1.5, 4, 9, 12, 8, 5, 5,
+    7, 8, 6, 5, 6, 9, 11, 8, 6, 4, 3, 2,
+)
+# Lunes a domingo
+PESO_DIA = (1, 1, 1, 1, 1, 0.7, 0.5)
+# (estado, peso) de los sensores y (tipo, peso)
+ESTADOS_SENSOR = (('activo', 94), ('inactivo', 3), ('bloqueado', 2), ('perdido', 1))
+TIPOS_SENSOR = (('tarjeta', 80), ('llavero', 18), ('otro', 2))
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea datos sintéticos para pruebas de carga: departamentos con su '
+        'barrera, sensores con usuario asignado y eventos de acceso repartidos '
+        'en los últimos días con la distribución horaria y semanal de un '
+        'edificio. Los eventos se insertan en lotes y al final se reconstruyen '
+        'los resúmenes por hora del periodo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departamentos', type=int, default=20)
+        parser.add_argument('--sensores', type=int, default=50, help='Sensores por departamento')
+        parser.add_argument('--eventos', type=int, default=100000, help='Eventos en total')
+        parser.add_argument('--dias', type=int, default=90, help='Días completos (hasta ayer) que cubren los eventos')
+        parser.add_argument('--lote', type=int, default=5000, help='Eventos por inserción')
+        parser.add_argument('--prefijo', default='SIM', help='Prefijo de nombres y UIDs (debe ser nuevo)')
+        parser.add_argument('--semilla', type=int, help='Semilla aleatoria para repetir los mismos datos')
+        parser.add_argument('--sin-resumenes', action='store_true', help='No reconstruir EventoResumenHora')
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        prefijo = options['prefijo']
+        if Departamento.objects.filter(nombre__startswith=f'{prefijo} ').exists():
+            raise CommandError(f'Ya existen datos con el prefijo "{prefijo}"; use otro --prefijo')
+
+        sensores = self._crear_estructura(azar, prefijo, options['departamentos'], options['sensores'])
+        self.stdout.write(f'{options["departamentos"]} departamentos y {len(sensores)} sensores creados')
+
+        inicio = time.monotonic()
+        creados = 0
+        for lote in self._lotes_eventos(azar, sensores, options['eventos'], options['dias'], options['lote']):
+            with transaction.atomic():
+                Evento.objects.bulk_create(lote)
+            creados += len(lote)
+            self.stdout.write(f'  {creados} eventos ({creados / (time.monotonic() - inicio):.0f}/s)')
+
+        # bulk_create no emite señales
+        acceso_cache.invalidar()
+        if creados and not options['sin_resumenes']:
+            call_command('reconstruir_resumenes', desde=self._primer_dia(options['dias']).isoformat(), stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'{creados} eventos creados en {time.monotonic() - inicio:.1f} s'
+        ))
+
+    @staticmethod
+    def _primer_dia(dias):
+        # Días completos hasta ayer: ningún evento queda en el futuro
+        return timezone.localdate() - timedelta(days=dias)
+
+    @staticmethod
+    def _crear_estructura(azar, prefijo, n_departamentos, n_sensores):
+        """Crea departamentos, barreras, usuarios y sensores; devuelve los sensores"""
+        estados, pesos_estado = zip(*ESTADOS_SENSOR)
+        tipos, pesos_tipo = zip(*TIPOS_SENSOR)
+        # Un solo hash para todos: make_password es lento a propósito
+        sin_password = make_password(None)
+        with transaction.atomic():
+            departamentos = Departamento.objects.bulk_create(
+                Departamento(nombre=f'{prefijo} Departamento {d:04d}', ubicacion=f'Torre {d % 4 + 1}')
+                for d in range(n_departamentos)
+            )
+            Barrera.objects.bulk_create(
+                Barrera(nombre=f'Barrera {departamento.nombre}', departamento=departamento)
+                for departamento in departamentos
+            )
+            usuarios = User.objects.bulk_create(
+                User(username=f'{prefijo.lower()}-{d:04d}-{s:05d}', password=sin_password)
+                for d in range(n_departamentos) for s in range(n_sensores)
+            )
+            usuarios = iter(usuarios)
+            sensores = Sensor.objects.bulk_create(
+                Sensor(
+                    uid=f'{prefijo}-{d:04d}-{s:05d}',
+                    nombre=f'Tarjeta {s:05d}',
+                    tipo=azar.choices(tipos, pesos_tipo)[0],
+                    estado=azar.choices(estados, pesos_estado)[0],
+                    departamento=departamento,
+                    usuario_asignado=next(usuarios),
+                )
+                for d, departamento in enumerate(departamentos) for s in range(n_sensores)
+            )
+        return sensores
+
+    def _lotes_eventos(self, azar, sensores, total, dias, tamano_lote):
+        """
+        Genera los eventos en orden cronológico, en listas de ``tamano_lote``.
+
+        Cada día recibe una parte del total según ``PESO_DIA`` y, dentro del
+        día, cada evento cae en una hora según ``PESO_HORA``. Unas pocas
+        tarjetas concentran buena parte de los accesos (pesos de Pareto).
+        """
+        pesos_sensor = [azar.paretovariate(1.2) for _ in sensores]
+        primer_dia = self._primer_dia(dias)
+        fechas = [primer_dia + timedelta(days=n) for n in range(dias)]
+        pesos_fecha = [PESO_DIA[fecha.weekday()] for fecha in fechas]
+        suma = sum(pesos_fecha)
+
+        lote = []
+        asignados = 0
+        acumulado = 0.0
+        for fecha, peso in zip(fechas, pesos_fecha):
+            # Reparto acumulado: la suma de los días da exactamente el total
+            acumulado += peso
+            cantidad = round(total * acumulado / suma) - asignados
+            asignados += cantidad
+            medianoche = timezone.make_aware(datetime.combine(fecha, dt_time.min))
+            horas = azar.choices(range(24), PESO_HORA, k=cantidad)
+            segundos = sorted(hora * 3600 + azar.random() * 3600 for hora in horas)
+            for sensor, segundo in zip(azar.choices(sensores, pesos_sensor, k=cantidad), segundos):
+                lote.append(self._evento(azar, sensor, medianoche + timedelta(seconds=segundo)))
+                if len(lote) >= tamano_lote:
+                    yield lote
+                    lote = []
+        if lote:
+            yield lote
+
+    @staticmethod
+    def _evento(azar, sensor, creado_en):
+        # Mismos campos que escribe registrar_acceso (ver decidir_acceso)
+        motivo = MOTIVOS_DENEGACION.get(sensor.estado)
+        if motivo:
+            tipo, resultado, descripcion, usuario_id = 'acceso_intento', 'denegado', motivo[0], None
+        else:
+            tipo, resultado, descripcion = 'acceso_permitido', 'permitido', 'Acceso permitido'
+            usuario_id = sensor.usuario_asignado_id
+        return Evento(
+            sensor_id=sensor.id,
+            departamento_id=sensor.departamento_id,
+            tipo=tipo,
+            resultado=resultado,
+            descripcion=descripcion,
+            usuario_id=usuario_id,
+            # Algunas lecturas repetidas absorbidas por el debounce
+            repeticiones=1 if azar.random() < 0.05 else 0,
+            creado_en=creado_en,
+        )
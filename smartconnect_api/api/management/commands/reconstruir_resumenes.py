@@ -0,0 +1,83 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from api.archivo import meses_archivados
+from api.eventos import conteos_por_hora, hora_resumen
+from api.models import Evento, EventoResumenHora
+
+TAMANO_LOTE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde el historial de eventos los conteos por hora (EventoResumenHora)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Reconstruir solo a partir de esta fecha ISO 8601 (se redondea a la hora)'
+        )
+        parser.add_argument(
+            '--todo', action='store_true',
+            help='Reconstruir también las horas de eventos ya archivados (se perderían sus conteos)'
+        )
+
+    def handle(self, *args, **options):
+        eventos = Evento.objects.order_by()
+        resumenes = EventoResumenHora.objects.all()
+
+        desde = None
+        if options['desde']:
+            desde = self._parse_fecha(options['desde'])
+        elif not options['todo'] and meses_archivados():
+            # Los eventos archivados ya no están en la tabla: se conservan sus conteos
+            primero = eventos.order_by('creado_en').values_list('creado_en', flat=True).first()
+            if primero is None:
+                self.stdout.write('No hay eventos sin archivar; nada que reconstruir')
+                return
+            desde = hora_resumen(primero)
+
+        if desde:
+            eventos = eventos.filter(creado_en__gte=desde)
+            resumenes = resumenes.filter(hora__gte=desde)
+
+        filas = conteos_por_hora(eventos)
+
+        creados = 0
+        with transaction.atomic():
+            borrados, _ = resumenes.delete()
+            lote = []
+            for fila in filas.iterator(chunk_size=TAMANO_LOTE):
+                lote.append(EventoResumenHora(
+                    departamento_id=fila['departamento_id'],
+                    tipo=fila['tipo'],
+                    resultado=fila['resultado_clave'],
+                    hora=fila['hora'],
+                    total=fila['total'],
+                ))
+                if len(lote) >= TAMANO_LOTE:
+                    EventoResumenHora.objects.bulk_create(lote)
+                    creados += len(lote)
+                    lote = []
+            EventoResumenHora.objects.bulk_create(lote)
+            creados += len(lote)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resúmenes reconstruidos: {creados} filas creadas, {borrados} eliminadas'
+        ))
+
+    @staticmethod
+    def _parse_fecha(valor):
+        try:
+            dia = parse_date(valor)
+            fecha = datetime.combine(dia, time.min) if dia else parse_datetime(valor)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            raise CommandError(f'Fecha inválida: {valor}')
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return hora_resumen(fecha)
@@ -0,0 +1,267 @@
+"""
+Métricas de la aplicación en el formato de texto de Prometheus.
+
+Los contadores e histogramas son del proceso y se actualizan bajo un lock
+que solo cubre la suma. No se usan diccionarios por hilo: con el worker
+gevent ``threading.local`` es por greenlet y cada petición dejaría uno.
+
+Con varios workers cada proceso vuelca sus totales a
+``METRICAS_DIR/<pid>-<inicio>.json`` cada ``METRICAS_VOLCADO_S`` segundos
+(y al terminar), y ``/api/metricas/`` suma los archivos de los demás
+procesos a los valores en vivo del suyo. ``<inicio>`` es el momento en que
+arrancó el proceso: un worker nuevo que recibe el pid de uno terminado no
+pisa su archivo. Los archivos de procesos terminados se conservan para que
+los contadores no retrocedan; se pueden borrar al reiniciar el servicio.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Límites (segundos) de las cubetas de los histogramas de latencia
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# nombre: (tipo, ayuda)
+METRICAS = {
+    'smartconnect_accesos_total': (
+        'counter', 'Decisiones de registrar_acceso por resultado, motivo y departamento'
+    ),
+    'smartconnect_accesos_repetidos_total': (
+        'counter', 'Lecturas repetidas respondidas con la decisión anterior (ACCESO_DEBOUNCE_MS)'
+    ),
+    'smartconnect_http_peticion_segundos': (
+        'histogram', 'Duración de las peticiones por vista, método y clase de código'
+    ),
+    'smartconnect_db_consultas_total': ('counter', 'Consultas SQL ejecutadas por vista'),
+    'smartconnect_docman_peticiones_total': ('counter', 'Peticiones a Docman por método y código HTTP'),
+    'smartconnect_docman_errores_total': ('counter', 'Errores de Docman por tipo'),
+}
+
+METODOS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+class Registro:
+    """Contadores e histogramas del proceso"""
+
+    def __init__(self, directorio: Optional[str] = None, intervalo: float = 10):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._reiniciar()
+        # Un proceso hijo (worker de gunicorn con --preload, multiprocessing)
+        # no debe volcar de nuevo lo que contó el padre
+        os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self) -> None:
+        self._contadores: Dict = {}
+        self._histogramas: Dict = {}
+        self._lock = threading.Lock()
+        self._inicio = time.time_ns() // 1000
+        self._proximo_volcado = time.monotonic() + self.intervalo
+
+    @property
+    def archivo(self) -> str:
+        """Nombre del volcado de este proceso (pid y momento de arranque)"""
+        return f'{os.getpid()}-{self._inicio}.json'
+
+    def incrementar(self, nombre: str, etiquetas: Etiquetas = (), valor: int = 1) -> None:
+        clave = (nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+        self._quizas_volcar()
+
+    def observar(self, nombre: str, etiquetas: Etiquetas, valor: float) -> None:
+        """Agrega una observación a un histograma: una cubeta por límite, +Inf y la suma"""
+        clave = (nombre, etiquetas)
+        indice = bisect_left(CUBETAS, valor)
+        with self._lock:
+            cubetas = self._histogramas.get(clave)
+            if cubetas is None:
+                cubetas = self._histogramas[clave] = [0] * (len(CUBETAS) + 1) + [0.0]
+            cubetas[indice] += 1
+            cubetas[-1] += valor
+        self._quizas_volcar()
+
+    def totales(self):
+        """Copia de los contadores e histogramas de este proceso"""
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {clave: list(cubetas) for clave, cubetas in self._histogramas.items()}
+        return contadores, histogramas
+
+    def _quizas_volcar(self) -> None:
+        if self.directorio and time.monotonic() >= self._proximo_volcado:
+            self._proximo_volcado = time.monotonic() + self.intervalo
+            self.volcar()
+
+    def volcar(self) -> None:
+        """Escribe los totales del proceso en ``<directorio>/<pid>-<inicio>.json``"""
+        if not self.directorio:
+            return
+        contadores, histogramas = self.totales()
+        if not contadores and not histogramas:
+            return
+        datos = {
+            'contadores': [[nombre, etiquetas, valor] for (nombre, etiquetas), valor in contadores.items()],
+            'histogramas': [[nombre, etiquetas, cubetas] for (nombre, etiquetas), cubetas in histogramas.items()],
+        }
+        ruta = os.path.join(self.directorio, self.archivo)
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo)
+            os.replace(temporal, ruta)
+        except OSError:
+            pass
+
+    def _totales_procesos(self):
+        """Totales de este proceso más los volcados por los demás"""
+        contadores, histogramas = self.totales()
+        if not self.directorio:
+            return contadores, histogramas
+        propio = self.archivo
+        try:
+            archivos = [nombre for nombre in os.listdir(self.directorio) if nombre.endswith('.json')]
+        except OSError:
+            archivos = []
+        for nombre_archivo in archivos:
+            if nombre_archivo == propio:
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre_archivo), encoding='utf-8') as archivo:
+                    datos = json.load(archivo)
+            except (OSError, ValueError):
+                continue
+            for nombre, etiquetas, valor in datos.get('contadores', []):
+                clave = (nombre, tuple(tuple(par) for par in etiquetas))
+                contadores[clave] = contadores.get(clave, 0) + valor
+            for nombre, etiquetas, cubetas in datos.get('histogramas', []):
+                _sumar_cubetas(histogramas, (nombre, tuple(tuple(par) for par in etiquetas)), cubetas)
+        return contadores, histogramas
+
+    def exportar(self) -> str:
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)"""
+        contadores, histogramas = self._totales_procesos()
+        por_nombre: Dict[str, list] = {}
+        for (nombre, etiquetas), valor in sorted(contadores.items()):
+            por_nombre.setdefault(nombre, []).append(
+                f'{nombre}{_etiquetas(etiquetas)} {valor}'
+            )
+        for (nombre, etiquetas), cubetas in sorted(histogramas.items()):
+            lineas = por_nombre.setdefault(nombre, [])
+            acumulado = 0
+            for limite, cantidad in zip(CUBETAS + ('+Inf',), cubetas):
+                acumulado += cantidad
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", str(limite)),))} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {cubetas[-1]!r}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {acumulado}')
+
+        salida = []
+        for nombre, (tipo, ayuda) in METRICAS.items():
+            salida.append(f'# HELP {nombre} {ayuda}')
+            salida.append(f'# TYPE {nombre} {tipo}')
+            salida.extend(por_nombre.get(nombre, []))
+        return '\n'.join(salida) + '\n'
+
+
+def _sumar_cubetas(histogramas, clave, cubetas) -> None:
+    actuales = histogramas.get(clave)
+    if actuales is None:
+        histogramas[clave] = list(cubetas)
+    else:
+        for indice, valor in enumerate(cubetas):
+            actuales[indice] += valor
+
+
+def _etiquetas(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nombre, valor in etiquetas
+    )
+
+
+registro = Registro(
+    directorio=getattr(settings, 'METRICAS_DIR', None) or None,
+    intervalo=getattr(settings, 'METRICAS_VOLCADO_S', 10),
+)
+atexit.register(registro.volcar)
+
+
+def activas() -> bool:
+    return getattr(settings, 'METRICAS_ACTIVAS', False)
+
+
+def contar_acceso(resultado: str, motivo: str, departamento_id) -> None:
+    """Decisión de registrar_acceso; ``departamento_id`` None si no existe"""
+    if activas():
+        registro.incrementar('smartconnect_accesos_total', (
+            ('resultado', resultado),
+            ('motivo', motivo),
+            ('departamento', str(departamento_id) if departamento_id is not None else 'desconocido'),
+        ))
+
+
+def contar_acceso_repetido(codigo: int) -> None:
+    if activas():
+        registro.incrementar('smartconnect_accesos_repetidos_total', (
+            ('resultado', 'permitido' if codigo == 200 else 'denegado'),
+        ))
+
+
+def contar_docman(metodo: str, codigo: Optional[int], error: Optional[str] = None) -> None:
+    """Petición a Docman; ``error``: conexion, http_4xx, http_5xx o circuito_abierto"""
+    if not activas():
+        return
+    if codigo is not None:
+        registro.incrementar('smartconnect_docman_peticiones_total', (
+            ('metodo', metodo.upper()), ('codigo', str(codigo)),
+        ))
+    if error:
+        registro.incrementar('smartconnect_docman_errores_total', (('tipo', error),))
+
+
+class MetricasMiddleware:
+    """Latencia y consultas SQL por vista (se quita de la cadena si ``METRICAS_ACTIVAS`` es False)"""
+
+    def __init__(self, get_response):
+        if not activas():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        consultas = 0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal consultas
+            consultas += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(contar))
+            response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        registro.observar('smartconnect_http_peticion_segundos', (
+            ('vista', vista),
+            ('metodo', request.method if request.method in METODOS else 'otro'),
+            ('codigo', f'{response.status_code // 100}xx'),
+        ), duracion)
+        if consultas:
+            registro.incrementar('smartconnect_db_consultas_total', (('vista', vista),), consultas)
+        return response
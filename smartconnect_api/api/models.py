@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 def validate_min_length_3(value):
     """Validar que la cadena tenga mínimo 3 caracteres"""
@@ -76,6 +77,9 @@ class Sensor(models.Model):
     class Meta:
         ordering = ['-creado_en']
         unique_together = ['uid', 'departamento']
+        indexes = [
+            models.Index(fields=['estado'], name='sensor_estado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.uid})"
@@ -116,15 +120,18 @@ class Evento(models.Model):
         ('barrera_cerrada', 'Barrera Cerrada'),
     ]
 
+    # Sin índice propio: son prefijo de los índices compuestos de Meta
     sensor = models.ForeignKey(
         Sensor,
         on_delete=models.CASCADE,
-        related_name='eventos'
+        related_name='eventos',
+        db_index=False
     )
     departamento = models.ForeignKey(
         Departamento,
         on_delete=models.CASCADE,
-        related_name='eventos'
+        related_name='eventos',
+        db_index=False
     )
     tipo = models.CharField(max_length=30, choices=TIPO_EVENTO)
     resultado = models.CharField(
@@ -141,11 +148,55 @@ class Evento(models.Model):
         blank=True,
         related_name='eventos'
     )
-    creado_en = models.DateTimeField(auto_now_add=True)
+    # Lecturas repetidas de la misma tarjeta absorbidas por ACCESO_DEBOUNCE_MS
+    repeticiones = models.PositiveIntegerField(default=0)
+    # Se asigna por defecto (en vez de auto_now_add) para conservar la hora
+    # real de los accesos que los lectores envían en lote
+    creado_en = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-creado_en']
         verbose_name_plural = 'Eventos'
+        # Coinciden con los filtros y el orden (creado_en, id) de la paginación por cursor
+        indexes = [
+            models.Index(fields=['-creado_en', '-id'], name='evento_creado_idx'),
+            models.Index(fields=['departamento', '-creado_en', '-id'], name='evento_depto_creado_idx'),
+            models.Index(fields=['sensor', '-creado_en', '-id'], name='evento_sensor_creado_idx'),
+            models.Index(fields=['tipo', 'resultado', '-creado_en', '-id'], name='evento_tipo_res_creado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.sensor.nombre} - {self.creado_en}"
+
+
+class EventoResumenHora(models.Model):
+    """
+    Conteo de eventos por departamento, tipo, resultado y hora (UTC).
+
+    Se actualiza de forma incremental al registrar eventos (``api/eventos.py``),
+    al editarlos o borrarlos desde el admin y al borrar su sensor, y se
+    reconstruye con ``manage.py reconstruir_resumenes``. Las estadísticas
+    se calculan sobre esta tabla, sin leer los eventos originales.
+    """
+    departamento = models.ForeignKey(
+        Departamento,
+        on_delete=models.CASCADE,
+        related_name='resumenes',
+        db_index=False
+    )
+    tipo = models.CharField(max_length=30, choices=Evento.TIPO_EVENTO)
+    # '' representa un evento sin resultado (NULL rompería la unicidad)
+    resultado = models.CharField(max_length=20, blank=True, default='')
+    hora = models.DateTimeField()
+    total = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hora']
+        verbose_name_plural = 'Resúmenes de eventos por hora'
+        unique_together = ['departamento', 'hora', 'tipo', 'resultado']
+        indexes = [
+            models.Index(fields=['hora'], name='resumen_hora_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.departamento_id} {self.hora:%Y-%m-%d %H}h {self.tipo}/{self.resultado}: {self.total}"
@@ -0,0 +1,172 @@
+"""
+Paginaciones personalizadas de la API
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre (``creado_en``, ``id``).
+
+    A diferencia de ``PageNumberPagination`` no usa ``OFFSET`` ni ``COUNT(*)``:
+    cada página filtra a partir de la posición del último registro visto, así
+    que la página N cuesta lo mismo que la primera. Los cursores ``next`` y
+    ``previous`` son opacos. El total solo se calcula si se pide ``?count=1``.
+
+    Respeta el orden ascendente o descendente por ``creado_en`` que deje el
+    ``OrderingFilter`` (por defecto, el del modelo).
+    """
+    campo_orden = 'creado_en'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) else None
+
+        self.descendente = self._es_descendente(queryset)
+        cursor = self.decode_cursor(request)
+        reverso = bool(cursor and cursor['reverso'])
+
+        # Recorrer hacia atrás equivale a invertir el orden
+        descendente = self.descendente != reverso
+        orden = ('-%s' % self.campo_orden, '-id') if descendente else (self.campo_orden, 'id')
+
+        def desde_queryset(despues_de, limite, descendente):
+            filas = queryset.order_by(*orden)
+            if despues_de:
+                filas = filas.filter(self._despues_de(despues_de, descendente))
+            return list(filas[:limite])
+
+        # Fuente adicional opcional con registros más antiguos que los del
+        # queryset (eventos archivados); se recorre a continuación de este
+        fuentes = [desde_queryset]
+        archivo = getattr(view, 'fuente_archivo', None)
+        if archivo is not None:
+            fuentes = [desde_queryset, archivo] if descendente else [archivo, desde_queryset]
+
+        filas = []
+        despues_de = (cursor['valor'], cursor['id']) if cursor else None
+        for fuente in fuentes:
+            faltan = self.page_size + 1 - len(filas)
+            if faltan <= 0:
+                break
+            filas += fuente(despues_de, faltan, descendente)
+            if filas:
+                despues_de = self._posicion(filas[-1])
+
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverso:
+            filas.reverse()
+
+        self.filas = filas
+        self.has_next = hay_mas if not reverso else cursor is not None
+        self.has_previous = cursor is not None if not reverso else hay_mas
+        return filas
+
+    def _posicion(self, fila):
+        """(valor, id) de un modelo o de un registro ya serializado (dict)"""
+        if isinstance(fila, dict):
+            valor = fila[self.campo_orden]
+            if isinstance(valor, str):
+                valor = datetime.fromisoformat(valor)
+            return valor, fila['id']
+        return getattr(fila, self.campo_orden), fila.pk
+
+    def _despues_de(self, despues_de, descendente):
+        """Filtro para los registros posteriores a la posición (valor, id)"""
+        valor, pk = despues_de
+        campo = self.campo_orden
+        if descendente:
+            # Equivale a (campo, id) < (valor, pk) y permite recorrer el índice por rango
+            return Q(**{'%s__lte' % campo: valor}) & ~Q(**{campo: valor, 'id__gte': pk})
+        return Q(**{'%s__gte' % campo: valor}) & ~Q(**{campo: valor, 'id__lte': pk})
+
+    def _es_descendente(self, queryset):
+        orden = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        return not orden or orden[0] != self.campo_orden
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    # ============ CURSORES ============
+
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')))
+            return {
+                'valor': datetime.fromisoformat(datos['v']),
+                'id': int(datos['i']),
+                'reverso': bool(datos.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverso):
+        valor, pk = self._posicion(obj)
+        datos = {'v': valor.isoformat(), 'i': pk}
+        if reverso:
+            datos['r'] = 1
+        codificado = base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode())
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.filas:
+            return None
+        return self.encode_cursor(self.filas[-1], reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.filas:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.filas[0], reverso=True)
+
+    # ============ RESPUESTA ============
+
+    def get_paginated_response(self, data):
+        contenido = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]
+        if self.count is not None:
+            contenido.insert(0, ('count', self.count))
+        return Response(OrderedDict(contenido))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,32 @@
+"""
+Parsers personalizados de la API
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # Está en requirements.txt; sin ella se usa json de la stdlib
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` que decodifica con orjson cuando está instalado.
+
+    Si orjson rechaza el cuerpo (JSON inválido, enteros de más de 64 bits,
+    surrogates sueltos) se vuelve a leer con el parser de DRF, que acepta lo
+    mismo que antes y devuelve el mismo mensaje de error.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        contenido = stream.read()
+        try:
+            return orjson.loads(contenido)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(contenido), media_type, parser_context)
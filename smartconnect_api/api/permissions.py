@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .authentication import MetricasTokenAuthentication
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     Permiso personalizado: Solo admin puede crear/editar/eliminar
@@ -26,3 +28,13 @@ class IsOperador(permissions.BasePermission):
         if request.method not in permissions.SAFE_METHODS:
             return request.user and request.user.is_staff
         return True
+
+
+class IsAdminOrMetricasToken(permissions.BasePermission):
+    """
+    Permiso personalizado: admin o el token de ``METRICAS_TOKEN``
+    """
+    def has_permission(self, request, view):
+        if isinstance(request.successful_authenticator, MetricasTokenAuthentication):
+            return True
+        return bool(request.user and request.user.is_staff)
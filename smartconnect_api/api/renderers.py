@@ -0,0 +1,97 @@
+"""
+Renderers personalizados de la API
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Está en requirements.txt; sin ella se usa json de la stdlib
+    orjson = None
+
+_CLAVES = frozenset((str,))
+_ESCALARES = frozenset((str, int, bool, type(None)))
+
+
+def _solo_tipos_basicos(data) -> bool:
+    """
+    True si ``data`` solo contiene dict con claves str, listas, tuplas, str,
+    int, bool y None: con esos tipos orjson produce exactamente los mismos
+    bytes que ``json.dumps(..., ensure_ascii=False)``. Los float (otra
+    notación exponencial), Decimal o fechas van por el camino de DRF.
+    """
+    pendientes = [data]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, dict):
+            if not _CLAVES.issuperset(map(type, valor)) and not all(isinstance(clave, str) for clave in valor):
+                return False
+            valores = valor.values()
+        elif isinstance(valor, (list, tuple)):
+            valores = valor
+        elif valor is None or isinstance(valor, (str, int)):
+            continue
+        else:
+            return False
+        # Caso común (una fila con solo escalares) sin recorrerla en Python
+        if not _ESCALARES.issuperset(map(type, valores)):
+            pendientes.extend(valores)
+    return True
+
+
+class DescargaRenderer(BaseRenderer):
+    """
+    Acepta cualquier ``Accept`` en las acciones que devuelven archivos.
+
+    La vista responde con un ``StreamingHttpResponse`` ya formateado; este
+    renderer solo se usa para los errores cuando el cliente no acepta JSON.
+    """
+    media_type = '*/*'
+    format = 'descarga'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    ``text/event-stream`` para el canal de Server-Sent Events.
+
+    Igual que ``DescargaRenderer``, la vista responde en streaming y este
+    renderer solo formatea los errores como un evento ``error``.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ('event: error\ndata: %s\n\n' % json.dumps(data, ensure_ascii=False)).encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` que codifica con orjson cuando está instalado.
+
+    Solo se usa orjson para la salida compacta sin ``indent`` y con datos de
+    tipos básicos (ver ``_solo_tipos_basicos``); en cualquier otro caso, o si
+    orjson rechaza los datos (enteros de más de 64 bits), se delega en DRF.
+    La respuesta es la misma byte a byte, incluido el escape de U+2028/U+2029.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not _solo_tipos_basicos(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            contenido = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
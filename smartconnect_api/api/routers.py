@@ -0,0 +1,95 @@
+"""
+Enrutamiento de lecturas a réplicas de la base de datos.
+
+Las escrituras van siempre a ``default`` (la primaria). Las lecturas van a
+una réplica solo dentro de ``leer_de_replica()``, que activan las vistas
+de solo lectura marcadas con ``LecturaReplicaMixin`` y el listado de
+eventos del admin; el resto del código lee de la primaria como siempre.
+
+Dentro de ese contexto las lecturas vuelven a la primaria:
+
+- después de cualquier escritura (para leer lo recién escrito);
+- dentro de ``usar_primaria()``;
+- en peticiones con el encabezado ``X-DB-Primaria: 1`` o ``?primaria=1``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import permissions
+
+# Réplica elegida para el contexto actual (None = primaria)
+_replica: ContextVar[Optional[str]] = ContextVar('replica', default=None)
+_primaria: ContextVar[bool] = ContextVar('primaria', default=False)
+
+
+def alias_replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+@contextmanager
+def leer_de_replica():
+    """Envía las lecturas del bloque a una réplica (si hay alguna configurada)"""
+    replicas = alias_replicas()
+    token = _replica.set(random.choice(replicas) if replicas else None)
+    token_primaria = _primaria.set(False)
+    try:
+        yield
+    finally:
+        _primaria.reset(token_primaria)
+        _replica.reset(token)
+
+
+@contextmanager
+def usar_primaria():
+    """Fuerza las lecturas del bloque a la primaria"""
+    token = _primaria.set(True)
+    try:
+        yield
+    finally:
+        _primaria.reset(token)
+
+
+def pide_primaria(request) -> bool:
+    return (
+        request.headers.get('X-DB-Primaria') == '1'
+        or request.GET.get('primaria') == '1'
+    )
+
+
+class ReplicaRouter:
+    """Router de ``DATABASE_ROUTERS``: lecturas a réplica solo cuando se pidió"""
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or _primaria.get():
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        if _replica.get() is not None:
+            # Lo que se lea a continuación debe incluir esta escritura
+            _primaria.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas contienen los mismos datos que la primaria
+        return True
+
+
+class LecturaReplicaMixin:
+    """
+    Atiende las peticiones de lectura (GET/HEAD/OPTIONS) de la vista con una
+    réplica. Las consultas que se evalúan después de devolver la respuesta
+    (respuestas en streaming) deben fijar la base con
+    ``queryset.using(router.db_for_read(modelo))``.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in permissions.SAFE_METHODS and not pide_primaria(request):
+            with leer_de_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
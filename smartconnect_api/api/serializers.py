@@ -19,7 +19,11 @@ class DepartamentoSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'creado_en', 'actualizado_en')
 
     def get_sensores_count(self, obj):
-        return obj.sensores.count()
+        # Los querysets del ViewSet lo anotan; sin anotación se cuenta aparte
+        count = getattr(obj, 'sensores_count', None)
+        if count is None:
+            count = obj.sensores.count()
+        return count
 
     def validate_nombre(self, value):
         if len(value) < 3:
@@ -86,9 +90,9 @@ class EventoSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'sensor', 'sensor_nombre', 'departamento', 'departamento_nombre',
             'tipo', 'resultado', 'descripcion', 'usuario', 'usuario_username',
-            'creado_en'
+            'repeticiones', 'creado_en'
         )
-        read_only_fields = ('id', 'creado_en')
+        read_only_fields = ('id', 'repeticiones', 'creado_en')
 
     def validate_tipo(self, value):
         valid_types = ['acceso_intento', 'acceso_permitido', 'acceso_denegado', 'barrera_abierta', 'barrera_cerrada']
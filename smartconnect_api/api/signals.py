@@ -0,0 +1,72 @@
+"""
+Receptores de señales de los modelos
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import CachedJWTAuthentication
+from .broadcast import broadcaster
+from .cache import acceso_cache
+from .eventos import descontar_resumenes
+from .models import Barrera, Departamento, Evento, Sensor
+
+
+def invalidar_acceso(usuarios: bool = False) -> None:
+    """
+    Invalida ahora y de nuevo al confirmar la transacción.
+
+    Mientras la transacción del admin sigue abierta, otra petición puede leer
+    la fila anterior y guardarla en la caché; sin la segunda invalidación esa
+    entrada (sin TTL por defecto) dejaría pasar a un sensor ya bloqueado.
+    Con ``usuarios`` se hace lo mismo con la caché de ``CachedJWTAuthentication``.
+    """
+    if usuarios:
+        CachedJWTAuthentication.invalidar()
+        transaction.on_commit(CachedJWTAuthentication.invalidar)
+    acceso_cache.invalidar()
+    transaction.on_commit(acceso_cache.invalidar)
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=Departamento)
+@receiver(post_delete, sender=Barrera)
+def invalidar_cache_acceso(sender, **kwargs):
+    """Invalida la caché de acceso cuando cambian los datos que guarda"""
+    invalidar_acceso()
+
+
+@receiver(post_save, sender=Barrera)
+def invalidar_cache_acceso_barrera(sender, update_fields=None, **kwargs):
+    """La caché solo guarda qué barrera tiene cada departamento"""
+    if update_fields and 'departamento' not in update_fields:
+        return
+    invalidar_acceso()
+
+
+@receiver(post_save, sender=Barrera)
+def notificar_cambio_barrera(sender, **kwargs):
+    """Despierta al broadcaster para difundir el cambio sin esperar al sondeo"""
+    transaction.on_commit(broadcaster.notificar)
+
+
+@receiver(post_save, sender=User)
+def invalidar_cache_acceso_usuario(sender, update_fields=None, **kwargs):
+    """Ignora el guardado de ``last_login`` que hace cada inicio de sesión"""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_acceso(usuarios=True)
+
+
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuarios(sender, **kwargs):
+    invalidar_acceso(usuarios=True)
+
+
+@receiver(pre_delete, sender=Sensor)
+def descontar_eventos_sensor(sender, instance, using, **kwargs):
+    """Los eventos del sensor se borran en cascada: se restan de los conteos por hora"""
+    descontar_resumenes(Evento.objects.using(using).filter(sensor=instance))
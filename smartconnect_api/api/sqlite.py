@@ -0,0 +1,37 @@
+"""
+Perfil de SQLite para varios workers escribiendo a la vez.
+
+En modo WAL los lectores no bloquean al escritor ni al revés, y con
+``synchronous=NORMAL`` cada commit no espera un ``fsync`` (sigue siendo
+seguro ante caídas del proceso; ante un corte de energía se pueden perder
+las últimas transacciones, no corromper la base). Los PRAGMA se aplican a
+cada conexión nueva con la señal ``connection_created``; ``journal_mode``
+queda guardado en el archivo.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragmas_sqlite():
+    pragmas = {
+        'busy_timeout': settings.SQLITE_BUSY_TIMEOUT_MS,
+        'synchronous': settings.SQLITE_SYNCHRONOUS,
+        # Negativo: tamaño en KiB en lugar de páginas
+        'cache_size': -settings.SQLITE_CACHE_KB,
+        'temp_store': 'MEMORY',
+    }
+    if settings.SQLITE_WAL:
+        pragmas['journal_mode'] = 'WAL'
+    if settings.SQLITE_MMAP_MB:
+        pragmas['mmap_size'] = settings.SQLITE_MMAP_MB * 1024 * 1024
+    return pragmas
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PERFIL:
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in pragmas_sqlite().items():
+            cursor.execute(f'PRAGMA {pragma} = {valor}')
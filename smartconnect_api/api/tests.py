@@ -0,0 +1,890 @@
+"""
+Pruebas de rendimiento de la API: que las consultas frecuentes usen sus
+índices, que cada endpoint ejecute una cantidad fija de consultas y que el
+cliente de Docman reintente, corte y cachee contra ``ServidorDocmanFalso``.
+Ejecutar con ``python manage.py test api``.
+"""
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, router, transaction
+from django.db.utils import ConnectionHandler
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import archivo
+from .archivo import archivar_eventos
+from .broadcast import BarreraBroadcaster, parse_id_evento
+from .cache import AccesoCache, acceso_cache, generacion
+from .condicional import ListaCondicionalMixin
+from .docman_service import CircuitBreaker, DocmanAPIClient
+from .docman_stub import ServidorDocmanFalso
+from .eventos import registrar_eventos
+from .exportacion import NOMBRES
+from .listados import FILAS_EVENTOS
+from .metricas import Registro
+from .models import Barrera, Departamento, Evento, EventoResumenHora, Sensor
+from .pagination import KeysetPagination
+from .routers import leer_de_replica
+
+
+class IndicesEventoTests(TestCase):
+    """Planes de las consultas del listado de eventos (``KeysetPagination``)"""
+
+    orden = ('-creado_en', '-id')
+
+    def plan(self, queryset):
+        # Mismas columnas y uniones que el listado JSON
+        return FILAS_EVENTOS.valores(queryset.order_by(*self.orden))[:51].explain()
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = self.plan(queryset)
+        self.assertIn(f'USING INDEX {indice}', plan)
+        # El índice ya entrega el orden: sin ordenar en memoria
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def despues_de(self):
+        return KeysetPagination()._despues_de((timezone.now(), 10), descendente=True)
+
+    def test_listado(self):
+        self.assertUsaIndice(Evento.objects.all(), 'evento_creado_idx')
+
+    def test_listado_ascendente(self):
+        plan = FILAS_EVENTOS.valores(Evento.objects.order_by('creado_en', 'id'))[:51].explain()
+        self.assertIn('USING INDEX evento_creado_idx', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_filtro_departamento(self):
+        self.assertUsaIndice(Evento.objects.filter(departamento_id=1), 'evento_depto_creado_idx')
+
+    def test_filtro_sensor(self):
+        self.assertUsaIndice(Evento.objects.filter(sensor_id=1), 'evento_sensor_creado_idx')
+
+    def test_filtro_tipo_resultado(self):
+        self.assertUsaIndice(
+            Evento.objects.filter(tipo='acceso_intento', resultado='denegado'),
+            'evento_tipo_res_creado_idx'
+        )
+
+    def test_cursor(self):
+        self.assertUsaIndice(Evento.objects.filter(self.despues_de()), 'evento_creado_idx')
+
+    def test_cursor_con_filtro(self):
+        queryset = Evento.objects.filter(departamento_id=1).filter(self.despues_de())
+        plan = self.plan(queryset)
+        # El rango del cursor se recorre dentro del índice compuesto
+        self.assertIn('USING INDEX evento_depto_creado_idx (departamento_id=? AND creado_en<?)', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_sensores_por_estado(self):
+        self.assertIn('USING INDEX sensor_estado_idx', Sensor.objects.filter(estado='bloqueado').explain())
+
+
+class ConsultasMixin:
+    """Datos mínimos y utilidades para contar las consultas de cada endpoint"""
+
+    client_class = APIClient
+
+    def setUp(self):
+        # Cachés del proceso: cada prueba parte en frío
+        acceso_cache.invalidar()
+        ListaCondicionalMixin.listas_cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-admin')
+        self.client.force_authenticate(self.admin)
+        self.departamento = Departamento.objects.create(nombre='Departamento 101')
+        self.barrera = Barrera.objects.create(nombre='Barrera 101', departamento=self.departamento)
+        self.sensor = self.crear_sensor('UID-0001')
+
+    def crear_sensor(self, uid, departamento=None):
+        usuario = User.objects.create_user(f'usuario-{uid}')
+        return Sensor.objects.create(
+            uid=uid, nombre=f'Tarjeta {uid}', departamento=departamento or self.departamento,
+            usuario_asignado=usuario,
+        )
+
+    def crear_datos(self, cantidad):
+        """Agrega ``cantidad`` departamentos, barreras, sensores y eventos con relaciones distintas"""
+        inicio = Departamento.objects.count()
+        for numero in range(inicio, inicio + cantidad):
+            departamento = Departamento.objects.create(nombre=f'Departamento extra {numero}')
+            Barrera.objects.create(nombre=f'Barrera extra {numero}', departamento=departamento)
+            sensor = self.crear_sensor(f'UID-extra-{numero}', departamento)
+            Evento.objects.create(
+                sensor=sensor, departamento=departamento, tipo='acceso_permitido',
+                resultado='permitido', usuario=sensor.usuario_asignado,
+            )
+
+    def consultas(self, metodo, url, datos=None):
+        with CaptureQueriesContext(connection) as capturadas:
+            if metodo == 'post':
+                respuesta = self.client.post(url, datos, format='json')
+            else:
+                respuesta = self.client.get(url)
+        self.assertLess(respuesta.status_code, 300, respuesta.content)
+        return [consulta['sql'] for consulta in capturadas.captured_queries]
+
+
+class ConsultasLecturaTests(ConsultasMixin, TestCase):
+    """Listados y detalles: cantidad fija de consultas, sin N+1"""
+
+    # Listados con ETag: validador (MAX/COUNT), COUNT de la página y filas
+    LISTADOS = {
+        '/api/sensores/': 3,
+        '/api/departamentos/': 3,
+        '/api/barreras/': 3,
+        # Paginación por cursor: sin COUNT ni validador
+        '/api/eventos/': 1,
+        '/api/eventos/?format=api': 1,
+    }
+
+    def test_listados(self):
+        self.crear_datos(2)
+        for url, esperadas in self.LISTADOS.items():
+            with self.subTest(url=url):
+                ListaCondicionalMixin.listas_cache.clear()
+                self.assertEqual(len(self.consultas('get', url)), esperadas)
+
+    def test_listados_no_crecen_con_las_filas(self):
+        self.crear_datos(2)
+        antes = {}
+        for url in self.LISTADOS:
+            ListaCondicionalMixin.listas_cache.clear()
+            antes[url] = len(self.consultas('get', url))
+        self.crear_datos(8)
+        for url in self.LISTADOS:
+            with self.subTest(url=url):
+                ListaCondicionalMixin.listas_cache.clear()
+                self.assertEqual(len(self.consultas('get', url)), antes[url])
+
+    def test_eventos_por_sensor(self):
+        self.crear_datos(3)
+        self.assertEqual(len(self.consultas('get', f'/api/eventos/por_sensor/?sensor_id={self.sensor.id}')), 1)
+
+    def test_detalles(self):
+        evento = Evento.objects.create(
+            sensor=self.sensor, departamento=self.departamento, tipo='acceso_permitido',
+            resultado='permitido', usuario=self.sensor.usuario_asignado,
+        )
+        for url in (
+            f'/api/sensores/{self.sensor.id}/',
+            f'/api/departamentos/{self.departamento.id}/',
+            f'/api/barreras/{self.barrera.id}/',
+            f'/api/eventos/{evento.id}/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(len(self.consultas('get', url)), 1)
+
+
+class ListaCondicionalTests(ConsultasMixin, TestCase):
+    """ETag y caché del cuerpo renderizado de ``ListaCondicionalMixin``"""
+
+    url = '/api/departamentos/'
+
+    def get(self, **extra):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(self.url, **extra)
+        return respuesta, [consulta['sql'] for consulta in capturadas.captured_queries]
+
+    def assertSoloValidador(self, consultas):
+        # Una sola consulta: el agregado MAX(actualizado_en)/COUNT del validador
+        self.assertEqual(len(consultas), 1, '\n'.join(consultas))
+        self.assertIn('MAX(', consultas[0])
+
+    def test_304_con_if_none_match(self):
+        self.crear_datos(2)
+        respuesta, _ = self.get()
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta['ETag']
+
+        respuesta, consultas = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], etag)
+        self.assertSoloValidador(consultas)
+
+    def test_cache_del_cuerpo_cuesta_una_consulta(self):
+        self.crear_datos(2)
+        primera, consultas = self.get()
+        self.assertGreater(len(consultas), 1)
+        segunda, consultas = self.get()
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+        self.assertSoloValidador(consultas)
+
+    def test_etag_cambia_al_modificar_y_al_borrar(self):
+        otro = Departamento.objects.create(nombre='Departamento 102')
+        inicial, _ = self.get()
+
+        self.departamento.nombre = 'Departamento 101 B'
+        self.departamento.save()
+        modificado, _ = self.get(HTTP_IF_NONE_MATCH=inicial['ETag'])
+        self.assertEqual(modificado.status_code, 200)
+        self.assertNotEqual(modificado['ETag'], inicial['ETag'])
+        self.assertIn('Departamento 101 B', modificado.content.decode())
+
+        otro.delete()
+        borrado, _ = self.get(HTTP_IF_NONE_MATCH=modificado['ETag'])
+        self.assertEqual(borrado.status_code, 200)
+        self.assertNotIn('Departamento 102', borrado.content.decode())
+
+
+@override_settings(EVENTOS_WRITE_BEHIND=False)
+class ConsultasAccesoTests(ConsultasMixin, TransactionTestCase):
+    """
+    Secuencia de consultas de ``registrar_acceso`` y del lote.
+
+    ``TransactionTestCase`` para ver las transacciones reales (BEGIN/COMMIT)
+    en lugar de los SAVEPOINT de ``TestCase``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Sin debounce: cada lectura escribe su evento
+        parche = mock.patch.object(acceso_cache, 'debounce', 0)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def registrar(self):
+        return self.consultas('post', '/api/sensores/registrar_acceso/', {
+            'uid': self.sensor.uid, 'departamento_id': self.departamento.id,
+        })
+
+    def assertSecuencia(self, consultas, esperadas):
+        self.assertEqual(len(consultas), len(esperadas), '\n'.join(consultas))
+        for consulta, inicio in zip(consultas, esperadas):
+            self.assertTrue(consulta.startswith(inicio), f'{consulta!r} no empieza con {inicio!r}')
+
+    def test_registrar_acceso_estable(self):
+        # La primera lectura llena acceso_cache y crea el resumen de la hora
+        self.registrar()
+        self.assertSecuencia(self.registrar(), [
+            'BEGIN',
+            'INSERT INTO "api_evento"',
+            'UPDATE "api_eventoresumenhora"',
+            'COMMIT',
+            'UPDATE "api_barrera"',
+        ])
+
+    def test_registrar_acceso_en_frio(self):
+        consultas = self.registrar()
+        # Sensor y departamento (con su barrera) salen de una consulta cada uno
+        self.assertTrue(consultas[0].startswith('SELECT'))
+        self.assertTrue(consultas[1].startswith('SELECT'))
+        self.assertEqual(consultas[2], 'BEGIN')
+        self.assertEqual(len(consultas), 10, '\n'.join(consultas))
+
+    def test_lote_no_crece_con_los_accesos(self):
+        otros = [self.crear_sensor(f'UID-lote-{numero}') for numero in range(5)]
+        url = '/api/sensores/registrar_accesos_lote/'
+        uno = [{'uid': self.sensor.uid, 'departamento_id': self.departamento.id}]
+        varios = [{'uid': sensor.uid, 'departamento_id': self.departamento.id} for sensor in otros] * 4
+        # Crea el resumen de la hora
+        self.consultas('post', url, varios)
+
+        acceso_cache.invalidar()
+        frio = self.consultas('post', url, varios)
+        caliente = self.consultas('post', url, varios)
+        # En frío solo se agrega un SELECT ... IN para sensores y otro para departamentos
+        self.assertEqual(len(frio), len(caliente) + 2, '\n'.join(frio))
+        self.assertSecuencia(caliente, [
+            'BEGIN',
+            'SAVEPOINT',
+            'INSERT INTO "api_evento"',
+            'UPDATE "api_eventoresumenhora"',
+            'RELEASE SAVEPOINT',
+            'UPDATE "api_barrera"',
+            'COMMIT',
+        ])
+        self.consultas('post', url, uno)
+        self.assertEqual(len(self.consultas('post', url, uno)), len(caliente))
+
+
+class BloqueoDesdeAdminTests(ConsultasMixin, TestCase):
+    """Un sensor bloqueado desde el admin deja de abrir la barrera en la lectura siguiente"""
+
+    def setUp(self):
+        super().setUp()
+        parche = mock.patch.object(acceso_cache, 'debounce', 0)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def registrar(self):
+        return self.client.post('/api/sensores/registrar_acceso/', {
+            'uid': self.sensor.uid, 'departamento_id': self.departamento.id,
+        }, format='json')
+
+    def test_bloqueo_desde_admin(self):
+        self.assertEqual(self.registrar().status_code, 200)
+        navegador = Client()
+        navegador.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = navegador.post(f'/admin/api/sensor/{self.sensor.id}/change/', {
+                'uid': self.sensor.uid,
+                'nombre': self.sensor.nombre,
+                'tipo': 'tarjeta',
+                'estado': 'bloqueado',
+                'departamento': self.departamento.id,
+                'usuario_asignado': self.sensor.usuario_asignado_id,
+            })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.registrar().status_code, 403)
+
+    def test_lectura_concurrente_con_la_transaccion(self):
+        self.registrar()
+        anterior = acceso_cache.get_sensor(self.sensor.uid)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.sensor.estado = 'bloqueado'
+                self.sensor.save()
+                # Otra petición leyó la fila aún confirmada y la guardó en la caché
+                acceso_cache.sensores.set(self.sensor.uid, anterior)
+        self.assertEqual(self.registrar().status_code, 403)
+
+
+@override_settings(SSE_HEARTBEAT_S=1, SSE_DURACION_MAX=3)
+class BarrerasStreamTests(ConsultasMixin, TransactionTestCase):
+    """Canal SSE ``/api/barreras/stream/`` con un broadcaster propio de cada prueba"""
+
+    def setUp(self):
+        super().setUp()
+        broadcaster = BarreraBroadcaster(intervalo_ms=20)
+        for modulo in ('api.views', 'api.signals'):
+            parche = mock.patch(f'{modulo}.broadcaster', broadcaster)
+            parche.start()
+            self.addCleanup(parche.stop)
+        otro = Departamento.objects.create(nombre='Departamento 102')
+        self.otra_barrera = Barrera.objects.create(nombre='Barrera 102', departamento=otro)
+        # Fuera de MARGEN_POLL: el estado inicial no se repite al reconectar
+        Barrera.objects.update(actualizado_en=timezone.now() - timedelta(hours=1))
+
+    def abrir(self, url='/api/barreras/stream/', **extra):
+        respuesta = self.client.get(url, **extra)
+        self.assertEqual(respuesta.status_code, 200)
+        self.addCleanup(respuesta.close)
+        return iter(respuesta.streaming_content)
+
+    def leer(self, flujo, cantidad):
+        """Hasta ``cantidad`` eventos ``barrera`` como (id, payload); menos si se cierra"""
+        eventos = []
+        for bloque in flujo:
+            lineas = dict(linea.split(': ', 1) for linea in bloque.decode().splitlines() if ': ' in linea)
+            if lineas.get('event') == 'barrera':
+                eventos.append((lineas['id'], json.loads(lineas['data'])))
+                if len(eventos) == cantidad:
+                    break
+        return eventos
+
+    def guardar(self, barrera, estado):
+        barrera.estado = estado
+        barrera.save()
+
+    def test_estado_inicial(self):
+        eventos = self.leer(self.abrir(), 2)
+        self.assertEqual({payload['id'] for _, payload in eventos}, {self.barrera.id, self.otra_barrera.id})
+
+    def test_cambio_despierta_a_los_clientes(self):
+        flujo = self.abrir()
+        self.leer(flujo, 2)
+        self.guardar(self.barrera, 'abierta')
+        [(_, payload)] = self.leer(flujo, 1)
+        self.assertEqual((payload['id'], payload['estado']), (self.barrera.id, 'abierta'))
+
+    def test_filtro_por_departamento(self):
+        flujo = self.abrir(f'/api/barreras/stream/?departamento={self.departamento.id}')
+        [(_, payload)] = self.leer(flujo, 1)
+        self.assertEqual(payload['id'], self.barrera.id)
+        self.guardar(self.otra_barrera, 'abierta')
+        self.guardar(self.barrera, 'abierta')
+        self.assertEqual([payload['id'] for _, payload in self.leer(flujo, 2)], [self.barrera.id])
+
+    def test_last_event_id_recupera_lo_perdido(self):
+        ultimo, _ = self.leer(self.abrir(), 2)[-1]
+        self.guardar(self.barrera, 'abierta')
+        flujo = self.abrir(HTTP_LAST_EVENT_ID=ultimo)
+        eventos = self.leer(flujo, 2)
+        self.assertEqual([(payload['id'], payload['estado']) for _, payload in eventos],
+                         [(self.barrera.id, 'abierta')])
+
+    def test_cambio_confirmado_tarde(self):
+        flujo = self.abrir()
+        self.leer(flujo, 2)
+        self.guardar(self.barrera, 'abierta')
+        [(ultimo, _)] = self.leer(flujo, 1)
+        # Otro worker confirma después un cambio con un actualizado_en anterior al id recibido
+        anterior = timezone.now() - timedelta(seconds=1)
+        self.assertLess(int(anterior.timestamp() * 1_000_000), parse_id_evento(ultimo)[0])
+        Barrera.objects.filter(id=self.otra_barrera.id).update(estado='abierta', actualizado_en=anterior)
+
+        [(_, payload)] = self.leer(flujo, 1)
+        self.assertEqual((payload['id'], payload['estado']), (self.otra_barrera.id, 'abierta'))
+        # También al reconectar con el id que el cliente tenía
+        eventos = self.leer(self.abrir(HTTP_LAST_EVENT_ID=ultimo), 2)
+        self.assertEqual([payload['id'] for _, payload in eventos], [self.otra_barrera.id])
+
+
+class ResumenesTests(ConsultasMixin, TestCase):
+    """Conteos por hora (``EventoResumenHora``) ante reconstrucción, admin y borrados en cascada"""
+
+    def setUp(self):
+        super().setUp()
+        self.navegador = Client()
+        self.navegador.force_login(self.admin)
+
+    def registrar(self, resultado='permitido', tipo='acceso_permitido', sensor=None):
+        sensor = sensor or self.sensor
+        return registrar_eventos([Evento(
+            sensor=sensor, departamento=sensor.departamento, tipo=tipo, resultado=resultado,
+        )])[0]
+
+    def totales(self):
+        return {
+            (resumen.tipo, resumen.resultado): resumen.total
+            for resumen in EventoResumenHora.objects.filter(total__gt=0)
+        }
+
+    def test_reconstruir_une_resultado_nulo_y_vacio(self):
+        self.registrar(resultado=None)
+        self.registrar(resultado='')
+        EventoResumenHora.objects.all().delete()
+        call_command('reconstruir_resumenes', stdout=io.StringIO())
+        self.assertEqual(self.totales(), {('acceso_permitido', ''): 2})
+
+    def test_admin_corrige_los_conteos(self):
+        evento = self.registrar()
+        otro = self.registrar()
+        respuesta = self.navegador.post(f'/admin/api/evento/{evento.id}/change/', {
+            'sensor': self.sensor.id,
+            'departamento': self.departamento.id,
+            'tipo': 'acceso_intento',
+            'resultado': 'denegado',
+            'descripcion': 'Corregido',
+            'repeticiones': 0,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.totales(), {('acceso_permitido', 'permitido'): 1, ('acceso_intento', 'denegado'): 1})
+
+        respuesta = self.navegador.post(f'/admin/api/evento/{otro.id}/delete/', {'post': 'yes'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.totales(), {('acceso_intento', 'denegado'): 1})
+
+        respuesta = self.navegador.post('/admin/api/evento/', {
+            'action': 'delete_selected', '_selected_action': [evento.id], 'post': 'yes',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.totales(), {})
+
+    def test_borrar_sensor_descuenta_sus_eventos(self):
+        otro = self.crear_sensor('UID-0002')
+        self.registrar()
+        self.registrar(sensor=otro)
+        self.registrar(sensor=otro)
+        otro.delete()
+        self.assertEqual(self.totales(), {('acceso_permitido', 'permitido'): 1})
+
+
+@override_settings(SQLITE_PERFIL=True)
+class SqlitePerfilTests(SimpleTestCase):
+    """
+    Versión corta de ``manage.py estres_sqlite``: escritores y lectores en
+    hilos, cada uno con su conexión a un archivo SQLite con el perfil de
+    ``api/sqlite.py``.
+    """
+
+    escritores = 4
+    lectores = 2
+    filas = 200
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        self.conexiones = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'{directorio}/estres.sqlite3',
+        }})
+        with self.conexiones['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE lectura (id INTEGER PRIMARY KEY, hilo INTEGER, numero INTEGER)')
+        self.conexiones['default'].close()
+
+    def ejecutar(self, funcion, *args):
+        try:
+            funcion(self.conexiones['default'], *args)
+        except OperationalError as e:
+            self.errores.append(str(e))
+        finally:
+            self.conexiones['default'].close()
+
+    def escribir(self, conexion, hilo):
+        with conexion.cursor() as cursor:
+            for numero in range(self.filas):
+                # Una transacción de escritura por fila, como registrar_acceso
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('INSERT INTO lectura (hilo, numero) VALUES (%s, %s)', [hilo, numero])
+                cursor.execute('COMMIT')
+
+    def leer(self, conexion):
+        with conexion.cursor() as cursor:
+            for _ in range(self.filas):
+                cursor.execute('SELECT COUNT(*), MAX(id) FROM lectura')
+                cursor.fetchone()
+
+    def test_escritores_y_lectores_sin_bloqueos(self):
+        self.errores = []
+        hilos = [
+            threading.Thread(target=self.ejecutar, args=(self.escribir, hilo)) for hilo in range(self.escritores)
+        ] + [
+            threading.Thread(target=self.ejecutar, args=(self.leer,)) for _ in range(self.lectores)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(self.errores, [])
+        with self.conexiones['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('SELECT COUNT(*) FROM lectura')
+            self.assertEqual(cursor.fetchone()[0], self.escritores * self.filas)
+        self.conexiones['default'].close()
+
+
+class ReplicaTests(ConsultasMixin, TestCase):
+    """
+    ``ReplicaRouter`` con una réplica en otro archivo SQLite. La réplica tiene
+    un evento que la primaria no, así se ve de qué base salió cada lectura.
+    """
+
+    REPLICA = 'replica_1'
+
+    # La réplica se agrega después de los chequeos del runner y de
+    # setUpClass, que validan y restringen los alias de ``databases``
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directorio = tempfile.mkdtemp()
+        # Como las réplicas de settings.py: la configuración de la primaria con otro archivo
+        configuracion = {**connections.settings['default'], 'NAME': f'{cls.directorio}/replica.sqlite3'}
+        # connections.settings es el mismo dict que settings.DATABASES
+        connections.settings[cls.REPLICA] = configuracion
+        call_command('migrate', database=cls.REPLICA, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.REPLICA].close()
+        del connections[cls.REPLICA]
+        del connections.settings[cls.REPLICA]
+        shutil.rmtree(cls.directorio)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.en_primaria = Evento.objects.create(
+            sensor=self.sensor, departamento=self.departamento, tipo='acceso_permitido', resultado='permitido',
+        )
+        # La réplica, con las mismas filas relacionadas y otro evento
+        for objeto in (self.departamento, self.sensor.usuario_asignado, self.sensor):
+            objeto.save(using=self.REPLICA)
+        self.en_replica = Evento.objects.using(self.REPLICA).create(
+            id=self.en_primaria.id + 1000, sensor_id=self.sensor.id, departamento_id=self.departamento.id,
+            tipo='acceso_intento', resultado='denegado',
+        )
+        self.addCleanup(self.vaciar_replica)
+
+    def vaciar_replica(self):
+        # La réplica queda fuera de la transacción de cada prueba
+        for modelo in (Evento, Sensor, Barrera, Departamento, User):
+            modelo.objects.using(self.REPLICA).all().delete()
+
+    def ids_eventos(self, url, **extra):
+        respuesta = self.client.get(url, **extra)
+        self.assertEqual(respuesta.status_code, 200)
+        return [evento['id'] for evento in respuesta.data['results']]
+
+    def test_lectura_de_la_vista_va_a_la_replica(self):
+        with CaptureQueriesContext(connections[self.REPLICA]) as en_replica:
+            self.assertEqual(self.ids_eventos('/api/eventos/'), [self.en_replica.id])
+        self.assertEqual(len(en_replica.captured_queries), 1)
+
+    def test_primaria_por_parametro_o_encabezado(self):
+        self.assertEqual(self.ids_eventos('/api/eventos/?primaria=1'), [self.en_primaria.id])
+        self.assertEqual(self.ids_eventos('/api/eventos/', HTTP_X_DB_PRIMARIA='1'), [self.en_primaria.id])
+
+    def test_escritura_y_lectura_siguiente_en_la_primaria(self):
+        with leer_de_replica():
+            self.assertEqual(router.db_for_read(Evento), self.REPLICA)
+            self.assertEqual(list(Evento.objects.values_list('id', flat=True)), [self.en_replica.id])
+            nuevo = Evento.objects.create(
+                sensor=self.sensor, departamento=self.departamento, tipo='acceso_permitido',
+            )
+            self.assertEqual(router.db_for_read(Evento), 'default')
+            self.assertTrue(Evento.objects.filter(id=nuevo.id).exists())
+        self.assertFalse(Evento.objects.using(self.REPLICA).filter(id=nuevo.id).exists())
+
+
+class LecturasRepetidasTests(SimpleTestCase):
+    """Ventana de ``ACCESO_DEBOUNCE_MS`` en ``AccesoCache``"""
+
+    def test_invalidacion_de_otro_proceso_descarta_lecturas(self):
+        cache = AccesoCache(debounce=60)
+        cache.set_lectura('uid-1', 1, {'codigo': 200})
+        self.assertIsNotNone(cache.get_lectura('uid-1', 1))
+        # Otro worker bloqueó el sensor y actualizó la marca compartida
+        with mock.patch.object(generacion, 'cambio', return_value=True):
+            self.assertIsNone(cache.get_lectura('uid-1', 1))
+
+    def test_invalidar_descarta_lecturas(self):
+        cache = AccesoCache(debounce=60)
+        cache.set_lectura('uid-1', 1, {'codigo': 200})
+        cache.invalidar()
+        self.assertIsNone(cache.get_lectura('uid-1', 1))
+
+
+class MetricasTests(SimpleTestCase):
+    """Registro de métricas del proceso y suma de los volcados de otros workers"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+
+    def test_hilos_no_acumulan_estado(self):
+        registro = Registro()
+
+        def contar():
+            for _ in range(100):
+                registro.incrementar('smartconnect_accesos_total', (('resultado', 'permitido'),))
+                registro.observar('smartconnect_http_peticion_segundos', (('vista', 'v'),), 0.02)
+
+        hilos = [threading.Thread(target=contar) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        contadores, histogramas = registro.totales()
+        self.assertEqual(contadores[('smartconnect_accesos_total', (('resultado', 'permitido'),))], 2000)
+        self.assertEqual(sum(histogramas[('smartconnect_http_peticion_segundos', (('vista', 'v'),))][:-1]), 2000)
+        # Un solo diccionario por proceso, sin importar cuántos hilos registraron
+        self.assertEqual(len(contadores), 1)
+
+    def test_pid_reutilizado_no_pisa_el_volcado(self):
+        terminado = Registro(self.directorio)
+        terminado.incrementar('smartconnect_accesos_total', valor=5)
+        terminado.volcar()
+        # Un worker nuevo con el mismo pid arranca en otro momento
+        with mock.patch('api.metricas.time.time_ns', return_value=terminado._inicio * 1000 + 10 ** 9):
+            nuevo = Registro(self.directorio)
+        nuevo.incrementar('smartconnect_accesos_total', valor=2)
+        nuevo.volcar()
+        self.assertNotEqual(terminado.archivo, nuevo.archivo)
+
+        scrape = Registro(self.directorio)
+        self.assertIn('smartconnect_accesos_total 7\n', scrape.exportar())
+
+
+class ExportacionTests(ConsultasMixin, TestCase):
+
+    def test_csv_sin_filas_incluye_encabezado(self):
+        respuesta = self.client.get('/api/eventos/exportar/?formato=csv&tipo=inexistente')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), (','.join(NOMBRES) + '\r\n').encode())
+
+
+class ArchivoTests(ConsultasMixin, TestCase):
+    """Lectura de los eventos archivados desde el listado (``?incluir_archivo=1``)"""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        configuracion = override_settings(EVENTOS_ARCHIVO_DIR=directorio)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        inicio = timezone.now() - timedelta(days=400)
+        registrar_eventos([
+            Evento(sensor=self.sensor, departamento=self.departamento, tipo='acceso_permitido',
+                   resultado='permitido', creado_en=inicio + timedelta(minutes=minuto))
+            for minuto in range(600)
+        ])
+        self.corte = inicio + timedelta(minutes=500)
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            ids += [evento['id'] for evento in respuesta.data['results']]
+            url = respuesta.data['next']
+        return ids
+
+    def test_archivo_interrumpido_no_duplica(self):
+        completos = self.recorrer('/api/eventos/?page_size=50')
+        archivar_eventos(antes_de=self.corte, lote=50, pausa=0)
+        # Un lote escrito en el archivo cuyo borrado no llegó a ejecutarse
+        with mock.patch('api.archivo.transaction.atomic', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                archivar_eventos(antes_de=self.corte + timedelta(minutes=50), lote=50, pausa=0)
+
+        ids = self.recorrer('/api/eventos/?page_size=50&incluir_archivo=1')
+        self.assertEqual(ids, completos)
+
+    def test_pagina_lee_solo_los_lotes_necesarios(self):
+        archivar_eventos(antes_de=self.corte, lote=50, pausa=0)
+        leer_miembro = archivo._leer_miembro
+        with mock.patch('api.archivo._leer_miembro', side_effect=leer_miembro) as leidos:
+            ids = self.recorrer('/api/eventos/?page_size=50&incluir_archivo=1')
+        self.assertEqual(len(ids), 600)
+        # 10 páginas del archivo, cada una cruza a lo sumo dos lotes de 50
+        self.assertLessEqual(leidos.call_count, 20)
+
+
+class DocmanClienteTests(SimpleTestCase):
+    """``DocmanAPIClient`` contra el servidor falso de ``docman_stub``"""
+
+    def setUp(self):
+        self.servidor = ServidorDocmanFalso(documentos=3).__enter__()
+        self.addCleanup(self.servidor.__exit__, None, None, None)
+        # Los errores simulados no ensucian la salida de las pruebas
+        silencio = mock.patch('api.docman_service.logger')
+        silencio.start()
+        self.addCleanup(silencio.stop)
+
+    def cliente(self, **ajustes):
+        ajustes = {'DOCMAN_API_URL': self.servidor.url, 'DOCMAN_BACKOFF': 0, **ajustes}
+        with override_settings(**ajustes):
+            return DocmanAPIClient()
+
+    def test_error_con_cuerpo_no_rompe_keep_alive(self):
+        cliente = self.cliente()
+        result = cliente.update_document_metadata('999', {'titulo': 'x'})
+        self.assertEqual(result['status_code'], 404)
+        result = cliente.get_document('1')
+        self.assertTrue(result['success'])
+        self.assertEqual(self.servidor.conexiones, 1)
+
+    def test_reintenta_ante_5xx(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=3)
+        self.servidor.caidas = 2
+        result = cliente.get_document('1')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['id'], '1')
+        self.assertEqual(self.servidor.peticiones, 3)
+
+    def test_circuito_se_abre(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=0, DOCMAN_CB_VENTANA=4, DOCMAN_CB_MIN_LLAMADAS=4,
+                               DOCMAN_CB_UMBRAL=0.5, DOCMAN_CB_ESPERA=60)
+        self.servidor.caidas = 100
+        for _ in range(4):
+            self.assertEqual(cliente.get_document('1')['status_code'], 503)
+        self.assertEqual(cliente.breaker.estado, CircuitBreaker.ABIERTO)
+
+        result = cliente.get_document('1')
+        self.assertTrue(result['circuit_open'])
+        # Con el circuito abierto no se llega al servidor
+        self.assertEqual(self.servidor.peticiones, 4)
+
+    def test_cada_reintento_cuenta_en_el_circuito(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=3, DOCMAN_CB_VENTANA=4, DOCMAN_CB_MIN_LLAMADAS=4,
+                               DOCMAN_CB_ESPERA=60)
+        self.servidor.caidas = 100
+        self.assertFalse(cliente.get_document('1')['success'])
+        # Una sola llamada con sus reintentos ya alcanza para abrir el circuito
+        self.assertEqual(cliente.breaker.estado, CircuitBreaker.ABIERTO)
+        self.assertEqual(self.servidor.peticiones, 4)
+
+    def test_timeout_no_se_reintenta(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=3, DOCMAN_TIMEOUT=0.05)
+        self.servidor.latencia = 0.3
+        self.assertIsNone(cliente.get_document('1')['status_code'])
+        self.assertEqual(self.servidor.peticiones, 1)
+
+    def test_error_inesperado_libera_la_prueba_semiabierta(self):
+        cliente = self.cliente(DOCMAN_CB_ESPERA=0)
+        with cliente.breaker._lock:
+            cliente.breaker._abrir()
+        with mock.patch.object(cliente.session, 'request', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                cliente.get_document('1')
+        # Sin try/finally la llamada de prueba quedaba en curso para siempre
+        self.assertTrue(cliente.get_document('1')['success'])
+
+    def test_json_invalido_se_registra_una_vez(self):
+        cliente = self.cliente()
+        with mock.patch.object(cliente.breaker, 'registrar') as registrar, \
+                mock.patch('requests.Response.json', side_effect=ValueError('cuerpo inválido')):
+            result = cliente.get_document('1')
+        self.assertFalse(result['success'])
+        registrar.assert_called_once_with(False)
+
+    def test_operaciones_masivas_respetan_el_orden(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=0)
+        self.servidor.latencia = 0.01
+        documentos = cliente.get_documents(['3', '999', '1', '2'])
+        self.assertEqual([result['status_code'] for result in documentos], [200, 404, 200, 200])
+        self.assertEqual([result['data']['id'] for result in documentos if result['success']], ['3', '1', '2'])
+
+        cambios = cliente.update_metadata_many({'2': {'orden': 2}, '999': {}, '1': {'orden': 1}})
+        self.assertEqual([result['status_code'] for result in cambios], [200, 404, 200])
+        self.assertEqual(self.servidor.documentos['1']['metadata'], {'orden': 1})
+
+        borrados = cliente.delete_documents(['1', '999', '3'])
+        self.assertEqual([result['status_code'] for result in borrados], [204, 404, 204])
+        self.assertEqual(list(self.servidor.documentos), ['2'])
+
+    def test_concurrencia_limita_las_peticiones_en_vuelo(self):
+        cliente = self.cliente(DOCMAN_BULK_CONCURRENCIA=3, DOCMAN_POOL_SIZE=10)
+        self.servidor.latencia = 0.05
+        resultados = cliente.get_documents(['1', '2', '3'] * 4)
+        self.assertTrue(all(result['success'] for result in resultados))
+        self.assertEqual(self.servidor.max_en_vuelo, 3)
+
+    def test_detener_en_error_cancela_lo_no_enviado(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=0, DOCMAN_BULK_CONCURRENCIA=2)
+        self.servidor.latencia = 0.02
+        self.servidor.caidas = 100
+        resultados = cliente.get_documents([str(numero) for numero in range(10)], detener_en_error=True)
+        # Las dos primeras ya estaban en vuelo al llegar el primer 503
+        self.assertEqual([result['status_code'] for result in resultados[:2]], [503, 503])
+        self.assertTrue(all(result.get('cancelled') for result in resultados[2:]))
+        self.assertEqual(self.servidor.peticiones, 2)
+
+    def test_subida_se_reanuda(self):
+        cliente = self.cliente(DOCMAN_MAX_RETRIES=0)
+        contenido = bytes(range(256)) * 40
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as temporal:
+            temporal.write(contenido)
+            temporal.flush()
+            self.servidor.fallos = {1: 1}
+            result = cliente.upload_document(temporal.name, chunk_size=4096)
+            self.assertFalse(result['success'])
+            upload_id = result['upload_id']
+            self.assertEqual(sorted(self.servidor.subidas[upload_id]['chunks']), [0])
+
+            peticiones = self.servidor.peticiones
+            result = cliente.upload_document(temporal.name, upload_id=upload_id)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['size'], len(contenido))
+        # Estado de la subida, los bloques 1 y 2 y la confirmación: el 0 no se reenvía
+        self.assertEqual(self.servidor.peticiones - peticiones, 4)
+
+    def test_cache_hit_y_revalidacion(self):
+        cliente = self.cliente(DOCMAN_CACHE_ENABLED=True)
+        primero = cliente.get_document('1')
+        segundo = cliente.get_document('1')
+        self.assertEqual(primero, segundo)
+        self.assertEqual(self.servidor.peticiones, 1)
+        self.assertEqual(cliente.cache_stats()['hits'], 1)
+
+        cliente.cache_ttl_documento = 0
+        cliente.get_document('2')
+        cliente.get_document('2')
+        # Vencida la entrada se revalida con If-None-Match y el servidor responde 304
+        self.assertEqual(cliente.cache_stats()['revalidaciones'], 1)
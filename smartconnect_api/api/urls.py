@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
-    DepartamentoViewSet, SensorViewSet, BarreraViewSet, EventoViewSet
+    DepartamentoViewSet, SensorViewSet, BarreraViewSet, EventoViewSet, metricas
 )
 
 router = DefaultRouter()
@@ -16,6 +16,9 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
+    # Métricas para Prometheus
+    path('metricas/', metricas, name='metricas'),
+
     # Router
     path('', include(router.urls)),
 ]
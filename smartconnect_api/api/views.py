@@ -1,19 +1,168 @@
+import json
+from datetime import datetime, time, timedelta
+from time import monotonic
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Sensor, Departamento, Evento, Barrera
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Sensor, Departamento, Evento, Barrera, EventoResumenHora
 from .serializers import (
     UserSerializer, SensorSerializer, DepartamentoSerializer,
     EventoSerializer, BarreraSerializer
 )
-from .permissions import IsAdmin, IsOperador
+from .authentication import MetricasTokenAuthentication
+from .permissions import IsAdmin, IsAdminOrMetricasToken, IsOperador
+from .condicional import ListaCondicionalMixin
+from .instrumentacion import medir
+from .listados import FILAS_EVENTOS, FILAS_SENSORES, ListaRapidaMixin
+from .metricas import contar_acceso, contar_acceso_repetido, registro as registro_metricas
+from .pagination import KeysetPagination
+from .routers import LecturaReplicaMixin
+from .renderers import DescargaRenderer, EventStreamRenderer
+from .archivo import leer_archivo
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION, comprimir_gzip, filas_eventos
+from .broadcast import broadcaster, cambios_desde, id_evento, parse_id_evento
+from .cache import acceso_cache
+from .eventos import hora_resumen, registrar_evento, registrar_eventos
+
+
+# Estados de sensor que deniegan el acceso: (descripción del evento, mensaje)
+MOTIVOS_DENEGACION = {
+    'bloqueado': ('Sensor bloqueado', 'Acceso denegado. Sensor bloqueado.'),
+    'perdido': ('Sensor reportado como perdido', 'Acceso denegado. Sensor reportado como perdido.'),
+    'inactivo': ('Sensor inactivo', 'Acceso denegado. Sensor inactivo.'),
+}
+
+
+def decidir_acceso(sensor, departamento):
+    """
+    Decide un intento de acceso a partir de la información de ``acceso_cache``.
+
+    Devuelve los campos del Evento a registrar, el cuerpo de la respuesta y
+    su código de estado.
+    """
+    motivo = MOTIVOS_DENEGACION.get(sensor['estado'])
+    if motivo:
+        descripcion, mensaje = motivo
+        evento = {
+            'sensor_id': sensor['id'],
+            'departamento_id': departamento['id'],
+            'tipo': 'acceso_intento',
+            'resultado': 'denegado',
+            'descripcion': descripcion,
+        }
+        return evento, {'error': mensaje}, status.HTTP_403_FORBIDDEN
+
+    evento = {
+        'sensor_id': sensor['id'],
+        'departamento_id': departamento['id'],
+        'tipo': 'acceso_permitido',
+        'resultado': 'permitido',
+        'descripcion': 'Acceso permitido',
+        'usuario_id': sensor['usuario_asignado_id'],
+    }
+    cuerpo = {'mensaje': 'Acceso permitido', 'sensor': sensor['data']}
+    return evento, cuerpo, status.HTTP_200_OK
+
+
+def parse_lectura(uid, departamento_id):
+    """
+    Valida los tipos de una lectura antes de usarla como clave de caché.
+
+    ``uid`` debe ser texto y ``departamento_id`` un entero (no booleano) o un
+    texto de dígitos. Devuelve ``(uid, departamento_id)`` con el departamento
+    como int, o None si algún tipo no es válido.
+    """
+    if not isinstance(uid, str):
+        return None
+    if isinstance(departamento_id, str) and departamento_id.isascii() and departamento_id.isdigit():
+        return uid, int(departamento_id)
+    if isinstance(departamento_id, int) and not isinstance(departamento_id, bool):
+        return uid, departamento_id
+    return None
+
+
+def abrir_barreras(barrera_ids):
+    """Abre las barreras indicadas con un solo UPDATE, omitiendo las ya abiertas"""
+    barrera_ids = [barrera_id for barrera_id in barrera_ids if barrera_id is not None]
+    if barrera_ids:
+        Barrera.objects.filter(
+            id__in=barrera_ids
+        ).exclude(estado='abierta').update(
+            estado='abierta',
+            actualizado_en=timezone.now()
+        )
+        transaction.on_commit(broadcaster.notificar)
+
 
+def contar_repeticion(evento):
+    """
+    Suma una lectura repetida al Evento original.
 
-class DepartamentoViewSet(viewsets.ModelViewSet):
+    Con escritura diferida el evento aún no tiene id y se busca por sensor,
+    departamento y hora; si el journal todavía no lo insertó, la repetición
+    no se cuenta.
+    """
+    if evento.get('id'):
+        filtro = {'id': evento['id']}
+    else:
+        filtro = {
+            'sensor_id': evento['sensor_id'],
+            'departamento_id': evento['departamento_id'],
+            'creado_en': evento['creado_en'],
+        }
+    Evento.objects.filter(**filtro).update(repeticiones=F('repeticiones') + 1)
+
+
+def parse_fecha(valor, campo):
+    """Convierte ``valor`` (fecha o fecha-hora ISO) en datetime con zona horaria"""
+    try:
+        dia = parse_date(valor)
+        fecha = datetime.combine(dia, time.min) if dia else parse_datetime(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise DRFValidationError({campo: 'Fecha inválida, use formato ISO 8601'})
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def es_solo_fecha(valor):
+    try:
+        return parse_date(valor) is not None
+    except ValueError:
+        return False
+
+
+def rango_fechas(params):
+    """Lee ``desde`` y ``hasta`` del query string; ``hasta`` con solo fecha incluye ese día"""
+    desde = hasta = None
+    if params.get('desde'):
+        desde = parse_fecha(params['desde'], 'desde')
+    if params.get('hasta'):
+        hasta = parse_fecha(params['hasta'], 'hasta')
+        if es_solo_fecha(params['hasta']):
+            hasta += timedelta(days=1)
+    return desde, hasta
+
+
+class DepartamentoViewSet(ListaCondicionalMixin, viewsets.ModelViewSet):
     """
     API ViewSet para Departamentos.
     
@@ -21,7 +170,10 @@ class DepartamentoViewSet(viewsets.ModelViewSet):
     - Admin: CRUD completo
     - Operador: Solo lectura
     """
-    queryset = Departamento.objects.all()
+    # Meta.ordering no se aplica en consultas con GROUP BY: se repite aquí
+    queryset = Departamento.objects.annotate(
+        sensores_count=Count('sensores')
+    ).order_by('-creado_en')
     serializer_class = DepartamentoSerializer
     permission_classes = [IsAuthenticated]
 
@@ -30,18 +182,22 @@ class DepartamentoViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
+    def queryset_validador(self, queryset):
+        # Sin la anotación (y su GROUP BY): el conteo de sensores lo cubre la marca de generación
+        return self.filter_queryset(Departamento.objects.all())
+
     def perform_create(self, serializer):
         serializer.save()
 
     @action(detail=False, methods=['get'])
     def activos(self, request):
         """Obtener solo departamentos activos"""
-        departamentos = Departamento.objects.filter(activo=True)
+        departamentos = self.get_queryset().filter(activo=True)
         serializer = self.get_serializer(departamentos, many=True)
         return Response(serializer.data)
 
 
-class SensorViewSet(viewsets.ModelViewSet):
+class SensorViewSet(ListaCondicionalMixin, ListaRapidaMixin, viewsets.ModelViewSet):
     """
     API ViewSet para Sensores RFID.
     
@@ -49,8 +205,9 @@ class SensorViewSet(viewsets.ModelViewSet):
     - Admin: CRUD completo
     - Operador: Solo lectura
     """
-    queryset = Sensor.objects.all()
+    queryset = Sensor.objects.select_related('departamento', 'usuario_asignado')
     serializer_class = SensorSerializer
+    filas_rapidas = FILAS_SENSORES
     permission_classes = [IsAuthenticated]
     filterset_fields = ['estado', 'departamento', 'tipo']
     search_fields = ['uid', 'nombre']
@@ -70,6 +227,13 @@ class SensorViewSet(viewsets.ModelViewSet):
         Registra un intento de acceso con un sensor.
         
         Requerido: uid, departamento_id
+
+        Sensores y departamentos se resuelven desde ``acceso_cache``, por lo
+        que una tarjeta conocida solo necesita escribir el Evento.
+
+        Con ``ACCESO_DEBOUNCE_MS``, las lecturas repetidas de la misma tarjeta
+        en el mismo departamento dentro de esa ventana reciben la decisión
+        original sin escribir otro Evento ni tocar la barrera.
         """
         uid = request.data.get('uid')
         departamento_id = request.data.get('departamento_id')
@@ -79,86 +243,157 @@ class SensorViewSet(viewsets.ModelViewSet):
                 {'error': 'uid y departamento_id son requeridos'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        try:
-            sensor = Sensor.objects.get(uid=uid)
-            departamento = Departamento.objects.get(id=departamento_id)
-
-            # Validar estado del sensor
-            if sensor.estado == 'bloqueado':
-                Evento.objects.create(
-                    sensor=sensor,
-                    departamento=departamento,
-                    tipo='acceso_intento',
-                    resultado='denegado',
-                    descripcion='Sensor bloqueado'
-                )
-                return Response(
-                    {'error': 'Acceso denegado. Sensor bloqueado.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            if sensor.estado == 'perdido':
-                Evento.objects.create(
-                    sensor=sensor,
-                    departamento=departamento,
-                    tipo='acceso_intento',
-                    resultado='denegado',
-                    descripcion='Sensor reportado como perdido'
-                )
-                return Response(
-                    {'error': 'Acceso denegado. Sensor reportado como perdido.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            if sensor.estado == 'inactivo':
-                Evento.objects.create(
-                    sensor=sensor,
-                    departamento=departamento,
-                    tipo='acceso_intento',
-                    resultado='denegado',
-                    descripcion='Sensor inactivo'
-                )
-                return Response(
-                    {'error': 'Acceso denegado. Sensor inactivo.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            # Acceso permitido
-            evento = Evento.objects.create(
-                sensor=sensor,
-                departamento=departamento,
-                tipo='acceso_permitido',
-                resultado='permitido',
-                descripcion='Acceso permitido',
-                usuario=sensor.usuario_asignado
+        valida = parse_lectura(uid, departamento_id)
+        if valida is None:
+            return Response(
+                {'error': 'uid debe ser texto y departamento_id un entero'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-
-            # Abrir barrera automáticamente
-            try:
-                barrera = Barrera.objects.get(departamento=departamento)
-                barrera.estado = 'abierta'
-                barrera.save()
-            except Barrera.DoesNotExist:
-                pass
-
-            return Response({
-                'mensaje': 'Acceso permitido',
-                'sensor': SensorSerializer(sensor).data,
-                'evento_id': evento.id
-            }, status=status.HTTP_200_OK)
-
-        except Sensor.DoesNotExist:
+        uid, departamento_id = valida
+
+        lectura = acceso_cache.get_lectura(uid, departamento_id)
+        if lectura is not None:
+            contar_acceso_repetido(lectura['codigo'])
+            if settings.ACCESO_DEBOUNCE_CONTAR:
+                contar_repeticion(lectura['evento'])
+            return Response(dict(lectura['cuerpo']), status=lectura['codigo'])
+
+        sensor = acceso_cache.get_sensor(uid)
+        if sensor is None:
+            contar_acceso('denegado', 'sensor_desconocido', None)
             return Response(
                 {'error': 'Sensor no encontrado'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Departamento.DoesNotExist:
+
+        departamento = acceso_cache.get_departamento(departamento_id)
+        if departamento is None:
+            contar_acceso('denegado', 'departamento_desconocido', None)
             return Response(
                 {'error': 'Departamento no encontrado'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        campos, cuerpo, codigo = decidir_acceso(sensor, departamento)
+        contar_acceso(campos['resultado'], sensor['estado'], departamento['id'])
+        campos['creado_en'] = timezone.now()
+        # Con escritura diferida el evento aún no tiene id
+        evento = registrar_evento(**campos)
+
+        if codigo == status.HTTP_200_OK:
+            # Abrir barrera automáticamente
+            abrir_barreras([departamento['barrera_id']])
+            cuerpo['evento_id'] = evento.id if evento else None
+
+        acceso_cache.set_lectura(uid, departamento_id, {
+            'cuerpo': cuerpo,
+            'codigo': codigo,
+            'evento': {'id': evento.id} if evento else campos,
+        })
+        return Response(cuerpo, status=codigo)
+
+    @action(detail=False, methods=['post'])
+    def registrar_accesos_lote(self, request):
+        """
+        Registra en lote los accesos que un lector acumuló sin conexión.
+
+        Recibe una lista (o ``{"accesos": [...]}``) de objetos con
+        uid, departamento_id y timestamp opcional. Resuelve sensores y
+        departamentos con una consulta ``IN`` cada uno, escribe todos los
+        eventos con un único ``bulk_create`` y abre cada barrera una sola
+        vez. Devuelve una decisión por elemento, en el mismo orden.
+        """
+        accesos = request.data
+        if isinstance(accesos, dict):
+            accesos = accesos.get('accesos')
+        if not isinstance(accesos, list) or not accesos:
+            return Response(
+                {'error': 'Se requiere una lista de accesos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(accesos) > settings.ACCESO_LOTE_MAX:
+            return Response(
+                {'error': f'Máximo {settings.ACCESO_LOTE_MAX} accesos por lote'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        accesos = [a if isinstance(a, dict) else {} for a in accesos]
+        # Tipos validados antes de armar los conjuntos: un uid lista o dict
+        # no es hashable y no debe tumbar el lote completo
+        lecturas = [parse_lectura(a.get('uid'), a.get('departamento_id')) for a in accesos]
+        sensores = acceso_cache.get_sensores(
+            {lectura[0] for lectura in lecturas if lectura and lectura[0]}
+        )
+        departamentos = acceso_cache.get_departamentos(
+            {lectura[1] for lectura in lecturas if lectura and lectura[1]}
+        )
+
+        resultados = []
+        eventos = []
+        barreras = set()
+        for acceso, lectura in zip(accesos, lecturas):
+            uid = acceso.get('uid')
+            departamento_id = acceso.get('departamento_id')
+            resultado = {'uid': uid, 'departamento_id': departamento_id}
+            resultados.append(resultado)
+
+            if not uid or not departamento_id:
+                resultado.update(status=status.HTTP_400_BAD_REQUEST, error='uid y departamento_id son requeridos')
+                continue
+            if lectura is None:
+                resultado.update(
+                    status=status.HTTP_400_BAD_REQUEST,
+                    error='uid debe ser texto y departamento_id un entero'
+                )
+                continue
+            uid, departamento_id = lectura
+
+            creado_en = self._parse_timestamp(acceso.get('timestamp'))
+            if creado_en is None:
+                resultado.update(status=status.HTTP_400_BAD_REQUEST, error='timestamp inválido')
+                continue
+
+            sensor = sensores.get(uid)
+            if sensor is None:
+                contar_acceso('denegado', 'sensor_desconocido', None)
+                resultado.update(status=status.HTTP_404_NOT_FOUND, error='Sensor no encontrado')
+                continue
+
+            departamento = departamentos.get(departamento_id)
+            if departamento is None:
+                contar_acceso('denegado', 'departamento_desconocido', None)
+                resultado.update(status=status.HTTP_404_NOT_FOUND, error='Departamento no encontrado')
+                continue
+
+            campos, cuerpo, codigo = decidir_acceso(sensor, departamento)
+            contar_acceso(campos['resultado'], sensor['estado'], departamento['id'])
+            cuerpo.pop('sensor', None)
+            resultado.update(status=codigo, **cuerpo)
+            eventos.append((resultado, Evento(creado_en=creado_en, **campos)))
+            if codigo == status.HTTP_200_OK:
+                barreras.add(departamento['barrera_id'])
+
+        with transaction.atomic():
+            registrar_eventos([evento for _, evento in eventos])
+            abrir_barreras(barreras)
+        for resultado, evento in eventos:
+            resultado['evento_id'] = evento.id
+
+        return Response({'resultados': resultados}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _parse_timestamp(valor):
+        """Convierte el timestamp del lector en datetime; sin valor usa la hora actual"""
+        if not valor:
+            return timezone.now()
+        try:
+            fecha = parse_datetime(str(valor))
+        except ValueError:
+            return None
+        if fecha is not None and timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
     @action(detail=True, methods=['post'])
     def bloquear(self, request, pk=None):
         """Bloquear un sensor"""
@@ -188,11 +423,11 @@ class SensorViewSet(viewsets.ModelViewSet):
         return Response({'mensaje': 'Sensor marcado como perdido'})
 
 
-class BarreraViewSet(viewsets.ModelViewSet):
+class BarreraViewSet(ListaCondicionalMixin, viewsets.ModelViewSet):
     """
     API ViewSet para control de Barreras.
     """
-    queryset = Barrera.objects.all()
+    queryset = Barrera.objects.select_related('departamento')
     serializer_class = BarreraSerializer
     permission_classes = [IsAuthenticated]
 
@@ -213,16 +448,16 @@ class BarreraViewSet(viewsets.ModelViewSet):
         barrera = self.get_object()
         barrera.estado = 'abierta'
         barrera.modo_manual = True
-        barrera.save()
+        barrera.save(update_fields=['estado', 'modo_manual', 'actualizado_en'])
 
         # Registrar evento
-        Evento.objects.create(
+        registrar_evento(
             sensor_id=1,  # Ajustar según necesidad
-            departamento=barrera.departamento,
+            departamento_id=barrera.departamento_id,
             tipo='barrera_abierta',
             resultado='permitido',
             descripcion='Barrera abierta manualmente',
-            usuario=request.user
+            usuario_id=request.user.id
         )
 
         return Response({'mensaje': 'Barrera abierta', 'estado': barrera.estado})
@@ -239,42 +474,249 @@ class BarreraViewSet(viewsets.ModelViewSet):
         barrera = self.get_object()
         barrera.estado = 'cerrada'
         barrera.modo_manual = True
-        barrera.save()
+        barrera.save(update_fields=['estado', 'modo_manual', 'actualizado_en'])
 
         # Registrar evento
-        Evento.objects.create(
+        registrar_evento(
             sensor_id=1,  # Ajustar según necesidad
-            departamento=barrera.departamento,
+            departamento_id=barrera.departamento_id,
             tipo='barrera_cerrada',
             resultado='permitido',
             descripcion='Barrera cerrada manualmente',
-            usuario=request.user
+            usuario_id=request.user.id
         )
 
         return Response({'mensaje': 'Barrera cerrada', 'estado': barrera.estado})
 
+    @action(detail=False, methods=['get'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def stream(self, request):
+        """
+        Cambios de estado de las barreras por Server-Sent Events.
+
+        Al conectar envía el estado actual (filtrable con ``?departamento=``) y
+        luego cada cambio como un evento ``barrera``. Para reconectar sin
+        perder cambios se usa el encabezado ``Last-Event-ID`` (o
+        ``?ultimo_id=``). La conexión se cierra tras ``SSE_DURACION_MAX``
+        segundos y el cliente reconecta solo.
+        """
+        departamento_id = request.query_params.get('departamento')
+        ultimo = parse_id_evento(
+            request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('ultimo_id')
+        )
 
-class EventoViewSet(viewsets.ReadOnlyModelViewSet):
+        def eventos():
+            despues_de = ultimo
+            # Último estado enviado de cada barrera en esta conexión
+            enviados = {}
+            fin = monotonic() + settings.SSE_DURACION_MAX
+            broadcaster.suscribir()
+            try:
+                yield 'retry: %d\n\n' % settings.SSE_RETRY_MS
+                cambios = cambios_desde(despues_de, departamento_id)
+                while True:
+                    for clave, payload in cambios:
+                        enviados[payload['id']] = clave
+                        despues_de = max(despues_de, clave) if despues_de else clave
+                        yield 'id: %s\nevent: barrera\ndata: %s\n\n' % (
+                            id_evento(clave), json.dumps(payload, ensure_ascii=False)
+                        )
+                    if not cambios:
+                        yield ': ping\n\n'
+                    restante = fin - monotonic()
+                    if restante <= 0:
+                        break
+                    cambios = broadcaster.esperar(
+                        despues_de, departamento_id,
+                        timeout=min(settings.SSE_HEARTBEAT_S, restante), enviados=enviados
+                    )
+            finally:
+                broadcaster.desuscribir()
+
+        response = StreamingHttpResponse(eventos(), content_type='text/event-stream; charset=utf-8')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Evita el buffer de nginx
+        return response
+
+
+class EventoViewSet(LecturaReplicaMixin, ListaRapidaMixin, viewsets.ReadOnlyModelViewSet):
     """
     API ViewSet para Eventos (solo lectura).
+
+    Lee de una réplica si hay ``DATABASE_REPLICAS`` configuradas
+    (``?primaria=1`` o ``X-DB-Primaria: 1`` para leer de la primaria).
+
+    Usa paginación por cursor: ``?cursor=`` para navegar, ``?page_size=``
+    para el tamaño de página y ``?count=1`` para incluir el total (solo de la
+    base de datos). ``?incluir_archivo=1`` agrega los eventos archivados.
     """
-    queryset = Evento.objects.all()
+    queryset = Evento.objects.select_related('sensor', 'departamento', 'usuario')
     serializer_class = EventoSerializer
+    filas_rapidas = FILAS_EVENTOS
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filterset_fields = ['sensor', 'departamento', 'tipo', 'resultado']
     ordering_fields = ['creado_en']
     ordering = ['-creado_en']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Filtros exactos por query string (?sensor=1&tipo=acceso_permitido)
+        filtros = {
+            campo: self.request.query_params[campo]
+            for campo in self.filterset_fields
+            if self.request.query_params.get(campo)
+        }
+        # Rango de fechas: ?desde= (inclusive) y ?hasta= (exclusive)
+        desde, hasta = rango_fechas(self.request.query_params)
+        if desde:
+            filtros['creado_en__gte'] = desde
+        if hasta:
+            filtros['creado_en__lt'] = hasta
+        try:
+            return queryset.filter(**filtros)
+        except (ValueError, ValidationError):
+            return queryset.none()
+
+    @property
+    def fuente_archivo(self):
+        """
+        Con ``?incluir_archivo=1``, lector de los meses archivados con el mismo
+        rango de fechas y filtros que la consulta. ``KeysetPagination`` lo
+        recorre a continuación de los eventos de la base de datos.
+        """
+        params = self.request.query_params
+        if not params.get('incluir_archivo') or self.action not in ('list', 'por_sensor'):
+            return None
+
+        filtros = {campo: params[campo] for campo in self.filterset_fields if params.get(campo)}
+        if self.action == 'por_sensor':
+            filtros['sensor'] = params.get('sensor_id')
+        desde, hasta = rango_fechas(params)
+
+        def leer(despues_de, limite, descendente):
+            return leer_archivo(filtros, desde, hasta, despues_de, limite, descendente)
+        return leer
+
+    def serializar_lista(self, filas):
+        """Serializa los modelos de la página; los eventos archivados ya vienen como dict"""
+        with medir('serializacion'):
+            if self.usa_lista_rapida():
+                return self.filas_rapidas.filas(filas)
+            modelos = [fila for fila in filas if not isinstance(fila, dict)]
+            datos = iter(self.get_serializer(modelos, many=True).data)
+            return [fila if isinstance(fila, dict) else next(datos) for fila in filas]
+
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, DescargaRenderer])
+    def exportar(self, request):
+        """
+        Exporta eventos en streaming con memoria constante.
+
+        Parámetros: formato (csv | ndjson), gzip=1 para comprimir al vuelo y
+        los mismos filtros del listado (desde, hasta, sensor, departamento,
+        tipo, resultado). Las filas salen en orden cronológico.
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS_EXPORTACION:
+            return Response(
+                {'error': f"formato debe ser uno de: {', '.join(FORMATOS_EXPORTACION)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        generar, content_type = FORMATOS_EXPORTACION[formato]
+        # El streaming se consume fuera del contexto de la réplica: se fija aquí
+        eventos = self.get_queryset().using(router.db_for_read(Evento))
+        cuerpo = generar(filas_eventos(eventos))
+        nombre = f'eventos.{formato}'
+        if request.query_params.get('gzip'):
+            cuerpo = comprimir_gzip(cuerpo)
+            content_type = 'application/gzip'
+            nombre += '.gz'
+
+        response = StreamingHttpResponse(cuerpo, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def estadisticas(self, request):
+        """
+        Conteos agregados de eventos, calculados sobre EventoResumenHora.
+
+        Parámetros: desde, hasta (resolución de una hora), departamento, tipo,
+        resultado e intervalo (hora | dia) para incluir una serie temporal.
+        """
+        resumenes = EventoResumenHora.objects.all()
+        desde, hasta = rango_fechas(request.query_params)
+        if desde:
+            resumenes = resumenes.filter(hora__gte=hora_resumen(desde))
+        if hasta:
+            resumenes = resumenes.filter(hora__lt=hasta)
+        filtros = {
+            campo: request.query_params[campo]
+            for campo in ('departamento', 'tipo', 'resultado')
+            if request.query_params.get(campo)
+        }
+        try:
+            resumenes = resumenes.filter(**filtros)
+        except (ValueError, ValidationError):
+            resumenes = resumenes.none()
+
+        intervalo = request.query_params.get('intervalo')
+        if intervalo and intervalo not in ('hora', 'dia'):
+            return Response(
+                {'error': "intervalo debe ser 'hora' o 'dia'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        conteos = {
+            'eventos': Coalesce(Sum('total'), 0),
+            'permitidos': Coalesce(Sum('total', filter=Q(resultado='permitido')), 0),
+            'denegados': Coalesce(Sum('total', filter=Q(resultado='denegado')), 0),
+        }
+        totales = resumenes.aggregate(**conteos)
+        por_departamento = (
+            resumenes
+            .values('departamento', 'departamento__nombre', 'tipo', 'resultado')
+            .annotate(eventos=Sum('total'))
+            .order_by('departamento', 'tipo', 'resultado')
+        )
+        data = {
+            'desde': desde,
+            'hasta': hasta,
+            **totales,
+            'por_departamento': [
+                {
+                    'departamento': fila['departamento'],
+                    'departamento_nombre': fila['departamento__nombre'],
+                    'tipo': fila['tipo'],
+                    'resultado': fila['resultado'] or None,
+                    'eventos': fila['eventos'],
+                }
+                for fila in por_departamento
+            ],
+        }
+
+        if intervalo:
+            periodo = TruncDay('hora') if intervalo == 'dia' else F('hora')
+            data['serie'] = list(
+                resumenes
+                .annotate(periodo=periodo)
+                .values('periodo')
+                .annotate(**conteos)
+                .order_by('periodo')
+            )
+
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def ultimos(self, request):
         """Obtener últimos 10 eventos"""
-        eventos = Evento.objects.all()[:10]
+        eventos = self.queryset.all()[:10]
         serializer = self.get_serializer(eventos, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def por_sensor(self, request):
-        """Obtener eventos por sensor"""
+        """Obtener eventos por sensor (paginado por cursor)"""
         sensor_id = request.query_params.get('sensor_id')
         if not sensor_id:
             return Response(
@@ -282,6 +724,24 @@ class EventoViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        eventos = Evento.objects.filter(sensor_id=sensor_id)
-        serializer = self.get_serializer(eventos, many=True)
-        return Response(serializer.data)
+        try:
+            eventos = self.filter_queryset(self.get_queryset()).filter(sensor_id=sensor_id)
+        except (ValueError, ValidationError):
+            eventos = Evento.objects.none()
+        page = self.paginate_queryset(self.queryset_lista(eventos))
+        return self.get_paginated_response(self.serializar_lista(page))
+
+
+@api_view(['GET'])
+@authentication_classes([MetricasTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+@permission_classes([IsAdminOrMetricasToken])
+def metricas(request):
+    """
+    Métricas de todos los workers en el formato de texto de Prometheus.
+
+    Requiere un usuario admin o ``Authorization: Bearer <METRICAS_TOKEN>``.
+    """
+    return HttpResponse(
+        registro_metricas.exportar(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
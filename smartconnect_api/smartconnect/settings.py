@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también al resto de middlewares (ver INSTRUMENTACION_*)
+    'api.instrumentacion.InstrumentacionMiddleware',
+    'api.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -63,14 +66,42 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'smartconnect.wsgi.application'
 
+# Perfil de SQLite para varios workers en producción (ver api/sqlite.py):
+# WAL, PRAGMA por conexión y conexiones persistentes. Desactivado por defecto
+# para que desarrollo y pruebas usen la configuración estándar de Django
+SQLITE_PERFIL = config('SQLITE_PERFIL', default=False, cast=bool)
+SQLITE_WAL = config('SQLITE_WAL', default=True, cast=bool)
+SQLITE_SYNCHRONOUS = config('SQLITE_SYNCHRONOUS', default='NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)
+SQLITE_CACHE_KB = config('SQLITE_CACHE_KB', default=20000, cast=int)
+SQLITE_MMAP_MB = config('SQLITE_MMAP_MB', default=0, cast=int)
+
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexiones persistentes: evita abrir la base y repetir los PRAGMA en cada petición
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60 if SQLITE_PERFIL else 0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Segundos que una escritura espera el bloqueo antes de "database is locked"
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
     }
 }
 
+# Réplicas de solo lectura (rutas de archivos SQLite separadas por coma). Las
+# vistas de eventos y reportes leen de ellas; ver api/routers.py
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+for numero, ruta in enumerate(DATABASE_REPLICAS, start=1):
+    DATABASES[f'replica_{numero}'] = {
+        **DATABASES['default'],
+        'NAME': ruta,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -103,11 +134,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Usan orjson si está instalado; la salida es la misma que con JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
@@ -117,6 +158,10 @@ REST_FRAMEWORK = {
 }
 
 # JWT Configuration
+# Caché del usuario autenticado por (usuario, jti); ver api/authentication.py
+JWT_USUARIO_CACHE_SIZE = config('JWT_USUARIO_CACHE_SIZE', default=10000, cast=int)
+JWT_USUARIO_CACHE_TTL = config('JWT_USUARIO_CACHE_TTL', default=300, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -164,6 +209,77 @@ else:
 DOCMAN_API_URL = config('DOCMAN_API_URL', default='')
 DOCMAN_API_KEY = config('DOCMAN_API_KEY', default='')
 DOCMAN_TIMEOUT = config('DOCMAN_TIMEOUT', default=30, cast=int)
+DOCMAN_POOL_SIZE = config('DOCMAN_POOL_SIZE', default=10, cast=int)
+DOCMAN_MAX_RETRIES = config('DOCMAN_MAX_RETRIES', default=3, cast=int)
+DOCMAN_BACKOFF = config('DOCMAN_BACKOFF', default=0.3, cast=float)
+# Peticiones simultáneas de get_documents / update_metadata_many / delete_documents
+DOCMAN_BULK_CONCURRENCIA = config('DOCMAN_BULK_CONCURRENCIA', default=DOCMAN_POOL_SIZE, cast=int)
+# Tamaño de página de iter_documents
+DOCMAN_ITER_PAGE_SIZE = config('DOCMAN_ITER_PAGE_SIZE', default=100, cast=int)
+# Subida por bloques: tamaño de bloque y desde qué tamaño de archivo se usa mmap
+DOCMAN_UPLOAD_CHUNK_SIZE = config('DOCMAN_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+DOCMAN_UPLOAD_MMAP_MIN = config('DOCMAN_UPLOAD_MMAP_MIN', default=64 * 1024 * 1024, cast=int)
+# Caché de get_document / list_documents (TTL en segundos; luego se revalida con ETag)
+DOCMAN_CACHE_ENABLED = config('DOCMAN_CACHE_ENABLED', default=False, cast=bool)
+DOCMAN_CACHE_SIZE = config('DOCMAN_CACHE_SIZE', default=1000, cast=int)
+DOCMAN_CACHE_TTL_DOCUMENTO = config('DOCMAN_CACHE_TTL_DOCUMENTO', default=60, cast=float)
+DOCMAN_CACHE_TTL_LISTADO = config('DOCMAN_CACHE_TTL_LISTADO', default=15, cast=float)
+# Circuit breaker: se abre si en las últimas VENTANA llamadas (mínimo MIN_LLAMADAS)
+# la proporción de fallos llega a UMBRAL, y prueba de nuevo tras ESPERA segundos
+DOCMAN_CB_VENTANA = config('DOCMAN_CB_VENTANA', default=20, cast=int)
+DOCMAN_CB_MIN_LLAMADAS = config('DOCMAN_CB_MIN_LLAMADAS', default=10, cast=int)
+DOCMAN_CB_UMBRAL = config('DOCMAN_CB_UMBRAL', default=0.5, cast=float)
+DOCMAN_CB_ESPERA = config('DOCMAN_CB_ESPERA', default=30, cast=float)
+DOCMAN_HEALTH_TTL = config('DOCMAN_HEALTH_TTL', default=10, cast=float)
+
+# Caché de autorización de sensores para registrar_acceso
+ACCESO_CACHE_SIZE = config('ACCESO_CACHE_SIZE', default=10000, cast=int)
+ACCESO_CACHE_TTL = config('ACCESO_CACHE_TTL', default=0, cast=int)  # 0 = sin expiración
+# Ventana en la que las lecturas repetidas de una tarjeta en el mismo departamento
+# reciben la decisión anterior sin registrar otro evento (0 = desactivado)
+ACCESO_DEBOUNCE_MS = config('ACCESO_DEBOUNCE_MS', default=0, cast=int)
+# Sumar las lecturas repetidas en Evento.repeticiones (un UPDATE por repetición)
+ACCESO_DEBOUNCE_CONTAR = config('ACCESO_DEBOUNCE_CONTAR', default=False, cast=bool)
+# Cuerpos renderizados de los listados con ETag (departamentos, sensores, barreras)
+LISTAS_CACHE_SIZE = config('LISTAS_CACHE_SIZE', default=256, cast=int)
+# Máximo de accesos aceptados por registrar_accesos_lote
+ACCESO_LOTE_MAX = config('ACCESO_LOTE_MAX', default=1000, cast=int)
+# Archivo cuyo mtime avisa a los demás workers que deben vaciar sus cachés
+CACHE_GENERACION_ARCHIVO = config('CACHE_GENERACION_ARCHIVO', default=str(BASE_DIR / '.cache_generacion'))
+
+# Escritura diferida de eventos (journal local + inserción por lotes en segundo plano)
+EVENTOS_WRITE_BEHIND = config('EVENTOS_WRITE_BEHIND', default=False, cast=bool)
+EVENTOS_JOURNAL_DIR = config('EVENTOS_JOURNAL_DIR', default=str(BASE_DIR / 'journal'))
+EVENTOS_FLUSH_MS = config('EVENTOS_FLUSH_MS', default=200, cast=int)
+EVENTOS_FLUSH_FILAS = config('EVENTOS_FLUSH_FILAS', default=500, cast=int)
+EVENTOS_COLA_MAX = config('EVENTOS_COLA_MAX', default=10000, cast=int)
+
+# Retención de eventos: los más antiguos se archivan en NDJSON comprimido por mes
+EVENTOS_RETENCION_DIAS = config('EVENTOS_RETENCION_DIAS', default=365, cast=int)
+EVENTOS_ARCHIVO_DIR = config('EVENTOS_ARCHIVO_DIR', default=str(BASE_DIR / 'archivo'))
+EVENTOS_ARCHIVO_LOTE = config('EVENTOS_ARCHIVO_LOTE', default=1000, cast=int)
+
+# Canal SSE de estado de barreras (/api/barreras/stream/)
+BARRERAS_POLL_MS = config('BARRERAS_POLL_MS', default=500, cast=int)
+SSE_HEARTBEAT_S = config('SSE_HEARTBEAT_S', default=15, cast=int)
+SSE_DURACION_MAX = config('SSE_DURACION_MAX', default=300, cast=int)
+SSE_RETRY_MS = config('SSE_RETRY_MS', default=2000, cast=int)
+
+# Instrumentación por petición (api/instrumentacion.py): Server-Timing y log
+# JSON con tiempos de SQL, vista, render y Docman; perfiles cProfile de una
+# fracción de las peticiones cuyo path empiece por INSTRUMENTACION_PERFIL_RUTA
+INSTRUMENTACION_ACTIVA = config('INSTRUMENTACION_ACTIVA', default=False, cast=bool)
+INSTRUMENTACION_PERFIL_FRACCION = config('INSTRUMENTACION_PERFIL_FRACCION', default=0.0, cast=float)
+INSTRUMENTACION_PERFIL_RUTA = config('INSTRUMENTACION_PERFIL_RUTA', default='/api/')
+INSTRUMENTACION_PERFIL_DIR = config('INSTRUMENTACION_PERFIL_DIR', default=str(BASE_DIR / 'perfiles'))
+
+# Métricas de Prometheus en /api/metricas/ (api/metricas.py). Cada worker
+# vuelca sus totales en METRICAS_DIR para sumarlos entre procesos
+METRICAS_ACTIVAS = config('METRICAS_ACTIVAS', default=True, cast=bool)
+METRICAS_DIR = config('METRICAS_DIR', default=str(BASE_DIR / 'metricas'))
+METRICAS_VOLCADO_S = config('METRICAS_VOLCADO_S', default=10, cast=float)
+# Token para el scrape de Prometheus (Authorization: Bearer); vacío = solo admin
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
 
 # Logging
 LOGGING = {
@@ -49,6 +49,6 @@ urlpatterns = [
     path('api/', include('api.urls')),
 ]
 
-# Handlers de errores personalizados
-handler404 = 'smartconnect.urls.handler404'
-handler500 = 'smartconnect.urls.handler500'
+# Handlers de errores personalizados: Django usa las funciones handler404 y
+# handler500 definidas arriba (reasignarlas a su ruta en texto las dejaba sin
+# poder importarse y el check urls.E008 impedía correr los tests)
@@ -9,3 +9,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartconnect.settings')
 
 application = get_wsgi_application()
+
+# Reprocesa los eventos pendientes del journal de escritura diferida (si está activa)
+from api.eventos import iniciar_journal  # noqa: E402
+
+iniciar_journal()